@@ -3,15 +3,31 @@ Main Streamlit application
 """
 import streamlit as st
 import pandas as pd
-from datetime import datetime
-from config import get_custom_css, get_copy_js
+from datetime import datetime, timedelta
+from config import (
+    get_custom_css, get_copy_js, CACHE_MAX_ENTRIES, CACHE_DIR, READER_BACKEND, PROJECT_COLUMNS, MERGED_CELLS
+)
 from utils import create_metric_card, html_preserve_text
-from data_processor import process_excel_file, group_shared_services
-from formatter import get_pickup_time_for_sorting, create_card_text, create_shared_card_text
+from data_processor import VEHICLE_INFO_COLUMNS, INTERNAL_COLUMNS
+from pipeline import run_pipeline, run_batch, run_pasted
+from cache import PipelineCache
+from column_mapping import get_profile_store
+from uploads import create_upload_stager
+from readers import supported_extensions
+from progress import CancelToken, IngestCancelled
+from memo import hit_rate
+from incremental import card_changes, CARD_ADDED, CARD_CHANGED
+from contextlib import ExitStack
 import warnings
 
 warnings.filterwarnings('ignore')
 
+# Badge text and colour of cards that are new or changed since the previous upload
+CARD_STATUS_BADGES = {CARD_ADDED: ("NEW", "#f59e0b"), CARD_CHANGED: ("UPDATED", "#8b5cf6")}
+
+# Sidebar choices for bookings repeating a PNR+LegId (see duplicates.find_duplicates)
+DUPLICATE_CHOICES = {"Flag only": None, "Keep first": 'first', "Keep latest": 'latest'}
+
 # Set page configuration
 st.set_page_config(
     page_title="Divine Tours & Travels",
@@ -21,6 +37,18 @@ st.set_page_config(
 )
 
 
+@st.cache_resource
+def get_pipeline_cache():
+    """Process-wide result cache shared by all sessions."""
+    return PipelineCache(max_entries=CACHE_MAX_ENTRIES, disk_dir=CACHE_DIR)
+
+
+@st.cache_resource
+def get_upload_stager():
+    """Process-wide upload spooling and ingest limits shared by all sessions."""
+    return create_upload_stager()
+
+
 def initialize_session_state():
     """Initialize session state variables."""
     if 'df' not in st.session_state:
@@ -31,6 +59,18 @@ def initialize_session_state():
         st.session_state.grouped_records = []
     if 'original_columns' not in st.session_state:
         st.session_state.original_columns = []
+    if 'column_report' not in st.session_state:
+        st.session_state.column_report = {}
+    if 'file_timings' not in st.session_state:
+        st.session_state.file_timings = []
+    if 'issues' not in st.session_state:
+        st.session_state.issues = None
+    if 'last_result' not in st.session_state:
+        st.session_state.last_result = None
+    if 'card_status' not in st.session_state:
+        st.session_state.card_status = None
+    if 'removed_cards' not in st.session_state:
+        st.session_state.removed_cards = []
     if 'processing_done' not in st.session_state:
         st.session_state.processing_done = False
     if 'copy_states' not in st.session_state:
@@ -71,8 +111,23 @@ def display_metrics(grouped_records):
         st.markdown(create_metric_card("Shared Groups", shared_count, "👥"), unsafe_allow_html=True)
 
 
-def display_cards(formatted_cards, grouped_records):
-    """Display formatted cards with copy buttons."""
+def card_status_badge(status, previous_number, number):
+    """Badge marking a card as new, updated or moved since the previous upload."""
+    if status in CARD_STATUS_BADGES:
+        label, color = CARD_STATUS_BADGES[status]
+    elif previous_number is not None and previous_number != number:
+        label, color = f"was #{previous_number}", "#6b7280"
+    else:
+        return ""
+    return f'<div class="card-status" style="background: {color};">{label}</div>'
+
+
+def display_cards(formatted_cards, grouped_records, card_status=None, removed_cards=None):
+    """
+    Display formatted cards with copy buttons.
+    `card_status` holds (status, previous number) per card after an
+    incremental re-upload (see incremental.card_changes).
+    """
     if not formatted_cards:
         st.warning("No data to display. Please upload and process a file first.")
         return
@@ -81,21 +136,35 @@ def display_cards(formatted_cards, grouped_records):
     tab1, tab2 = st.tabs(["📋 Formatted Cards", "📊 Original Data In Excel"])
     
     with tab1:
+        if card_status:
+            added = sum(status == CARD_ADDED for status, _ in card_status)
+            changed = sum(status == CARD_CHANGED for status, _ in card_status)
+            st.info(f"🔁 Since the previous upload: {added} new, {changed} updated, "
+                    f"{len(removed_cards or [])} removed cards")
+        
         # Display cards with copy buttons
         for i, card_text in enumerate(formatted_cards):
             if i < len(formatted_cards):
                 # Determine card type for badge
                 card_type = grouped_records[i]['type'] if i < len(grouped_records) else 'individual'
                 badge_color = "#4a6fa5" if card_type == 'individual' else "#10b981"
+                status_html = card_status_badge(*card_status[i], i + 1) if card_status else ""
                 
                 card_html = f"""
                 <div class="card-container">
                     <div class="card-badge" style="background: {badge_color};">#{i + 1}</div>
+                    {status_html}
                     <div class="data-card">{html_preserve_text(card_text)}</div>
                 </div>
                 """
                 
                 st.markdown(card_html, unsafe_allow_html=True)
+        
+        if removed_cards:
+            with st.expander(f"🗑️ Removed cards ({len(removed_cards)})", expanded=False):
+                for card_text in removed_cards:
+                    st.markdown(f'<div class="data-card">{html_preserve_text(card_text)}</div>',
+                                unsafe_allow_html=True)
     
     with tab2:
         if st.session_state.df is not None:
@@ -103,7 +172,8 @@ def display_cards(formatted_cards, grouped_records):
             st.subheader("Original Data")
             
             # Display the entire DataFrame with all columns
-            st.dataframe(st.session_state.df, use_container_width=True)
+            st.dataframe(st.session_state.df.drop(columns=INTERNAL_COLUMNS, errors='ignore'),
+                         use_container_width=True)
             
             # Show grouping information below it
             st.subheader("Grouping Summary")
@@ -159,6 +229,249 @@ def export_data(formatted_cards):
                     st.caption("First card format preview")
 
 
+def show_processed_preview(df):
+    """Display preview of processed data."""
+    with st.expander("👁️ Preview Processed Data", expanded=False):
+        st.write("First 10 rows after handling merged cells:")
+        st.dataframe(df.head(10).drop(columns=INTERNAL_COLUMNS, errors='ignore'), use_container_width=True)
+        
+        # Show vehicle/driver info distribution
+        st.write("Vehicle/Driver Info Distribution:")
+        vehicle_stats = pd.DataFrame({
+            'Column': VEHICLE_INFO_COLUMNS,
+            'Non-Empty Values': [df[col].astype(bool).sum() for col in VEHICLE_INFO_COLUMNS if col in df.columns]
+        })
+        st.dataframe(vehicle_stats, use_container_width=True)
+
+
+def show_validation_report(issues):
+    """Summarize data-quality issues found in the bookings, with the full list on demand."""
+    if issues is None or issues.empty:
+        return
+    context = [col for col in ('SourceFile', 'SheetName') if col in issues.columns]
+    rows = len(issues.drop_duplicates(context + ['Row']))
+    errors = int((issues['Severity'] == 'error').sum())
+    
+    with st.expander(f"⚠️ Data quality: {len(issues):,} issues in {rows:,} rows", expanded=errors > 0):
+        summary = issues.groupby(['Severity', 'Column', 'Issue'], sort=False).size().reset_index(name='Count')
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+        st.dataframe(issues, use_container_width=True, hide_index=True)
+        st.download_button(
+            label="📥 Download issues (CSV)",
+            data=issues.to_csv(index=False),
+            file_name="vtrack_issues.csv",
+            mime="text/csv"
+        )
+
+
+def show_column_report(report, original_columns):
+    """Show how the columns were mapped and offer to save unknown layouts as a profile."""
+    if not report:
+        return
+    if report.get('profile'):
+        st.sidebar.caption(f"🗂️ Column profile: {report['profile']}")
+        return
+    
+    with st.sidebar.expander("🗂️ Unknown column layout", expanded=bool(report.get('missing'))):
+        if report.get('closest_profile'):
+            st.write(f"Closest saved profile: **{report['closest_profile']}**")
+            if report.get('added_headers'):
+                st.write("New headers: " + ", ".join(report['added_headers']))
+            if report.get('removed_headers'):
+                st.write("Missing headers: " + ", ".join(report['removed_headers']))
+            for header, (old, new) in report.get('changed_mappings', {}).items():
+                st.write(f"`{header}`: {old or '—'} → {new or '—'}")
+        if report.get('unmapped'):
+            st.write("Unmapped headers: " + ", ".join(report['unmapped']))
+        if report.get('missing'):
+            st.write("Columns not found: " + ", ".join(report['missing']))
+        
+        profile_name = st.text_input("Profile name", key="profile_name")
+        if st.button("💾 Save layout as profile", use_container_width=True) and profile_name:
+            get_profile_store().save(
+                profile_name,
+                tuple(str(c).strip() for c in original_columns),
+                report['mapping']
+            )
+            st.success(f"Saved profile '{profile_name}'")
+
+
+def cancel_processing(cancel_token):
+    """Cancel button callback: stop the running pipeline and say so on the next run."""
+    cancel_token.cancel()
+    st.session_state.processing_cancelled = True
+
+
+def sidebar_progress():
+    """
+    Sidebar progress bar, status line and cancel button for one run.
+    Returns (progress callback, cancel token, function that removes the widgets).
+    """
+    progress_bar = st.sidebar.progress(0)
+    status_text = st.sidebar.empty()
+    cancel_slot = st.sidebar.empty()
+    cancel_token = CancelToken()
+    cancel_slot.button("⏹ Cancel processing", key=f"cancel_processing_{id(cancel_token)}",
+                       use_container_width=True, on_click=cancel_processing, args=(cancel_token,))
+    
+    def on_progress(percent, message):
+        progress_bar.progress(percent)
+        status_text.text(message)
+    
+    def clear():
+        progress_bar.empty()
+        status_text.empty()
+        cancel_slot.empty()
+    
+    return on_progress, cancel_token, clear
+
+
+def process_uploaded_file(uploaded_file, **options):
+    """Run the headless pipeline on an uploaded file, reporting progress in the sidebar."""
+    on_progress, cancel_token, clear_progress = sidebar_progress()
+    
+    stager = get_upload_stager()
+    try:
+        with stager.slot(on_wait=lambda: on_progress(0, "⏳ Waiting for other uploads to finish...")):
+            with stager.stage(uploaded_file) as source:
+                result = run_pipeline(
+                    source,
+                    filename=uploaded_file.name,
+                    progress_callback=on_progress,
+                    cancel_token=cancel_token,
+                    cache=get_pipeline_cache(),
+                    reader=READER_BACKEND,
+                    project_columns=PROJECT_COLUMNS,
+                    merged_cells=MERGED_CELLS,
+                    **options
+                )
+    except IngestCancelled:
+        st.warning("⏹ Processing cancelled")
+        return None
+    except ValueError as e:
+        st.error(f"❌ {str(e)}")
+        return None
+    except Exception as e:
+        st.error(f"❌ Error processing Excel file: {str(e)}")
+        st.exception(e)
+        return None
+    finally:
+        clear_progress()
+    
+    if result.from_cache:
+        st.success(f"⚡ Loaded {len(result.df)} records from cache")
+    else:
+        st.success(f"✅ Successfully loaded {len(result.df)} records with merged cell handling")
+    show_processed_preview(result.df)
+    
+    return result
+
+
+def process_uploaded_batch(uploaded_files, **options):
+    """Process several uploaded files in worker processes and merge their cards."""
+    on_progress, cancel_token, clear_progress = sidebar_progress()
+    
+    stager = get_upload_stager()
+    try:
+        with stager.slot(on_wait=lambda: on_progress(0, "⏳ Waiting for other uploads to finish...")):
+            with ExitStack() as stack:
+                sources = [
+                    (stack.enter_context(stager.stage(uploaded_file)), uploaded_file.name)
+                    for uploaded_file in uploaded_files
+                ]
+                batch = run_batch(
+                    sources,
+                    progress_callback=on_progress,
+                    cancel_token=cancel_token,
+                    cache=get_pipeline_cache(),
+                    reader=READER_BACKEND,
+                    project_columns=PROJECT_COLUMNS,
+                    merged_cells=MERGED_CELLS,
+                    **options
+                )
+    except IngestCancelled:
+        st.warning("⏹ Processing cancelled")
+        return None
+    except ValueError as e:
+        st.error(f"❌ {str(e)}")
+        return None
+    except Exception as e:
+        st.error(f"❌ Error processing Excel files: {str(e)}")
+        st.exception(e)
+        return None
+    finally:
+        clear_progress()
+    
+    st.success(f"✅ Loaded {len(batch.df)} records from {len(batch.files)} files")
+    return batch
+
+
+def process_pasted_text(text, **options):
+    """Run the pipeline on rows pasted from Excel; a handful of rows needs no progress bar."""
+    try:
+        # READER_BACKEND names a workbook reader, so let the pipeline pick the TSV one
+        result = run_pasted(
+            text,
+            cache=get_pipeline_cache(),
+            project_columns=PROJECT_COLUMNS,
+            merged_cells=MERGED_CELLS,
+            **options
+        )
+    except ValueError as e:
+        st.error(f"❌ {str(e)}")
+        return None
+    except Exception as e:
+        st.error(f"❌ Error processing pasted rows: {str(e)}")
+        st.exception(e)
+        return None
+
+    st.success(f"✅ Loaded {len(result.df)} pasted records")
+    return result
+
+
+def store_result(result, previous=None, single_file=True):
+    """Keep a pipeline or batch result in the session for display."""
+    st.session_state.df = result.df
+    st.session_state.original_columns = getattr(result, 'original_columns', [])
+    st.session_state.column_report = getattr(result, 'column_report', {})
+    st.session_state.file_timings = file_timings(result)
+    st.session_state.issues = result.issues
+    # Incremental re-uploads compare against the last single-file run
+    st.session_state.last_result = result if single_file else None
+    card_status, removed_cards = card_changes(previous, result) if previous else (None, [])
+    st.session_state.card_status = card_status
+    st.session_state.removed_cards = removed_cards
+    st.session_state.formatted_cards = result.formatted_cards
+    st.session_state.grouped_records = result.grouped_records  # Store for reference
+    st.session_state.processing_done = True
+
+
+def cleaner_hit_percent(result):
+    """Share of scalar cleaner calls a run served from the memo cache (None when unknown)."""
+    rate = hit_rate(getattr(result, 'cleaner_stats', {}))
+    return None if rate is None else round(100 * rate, 1)
+
+
+def file_timings(result):
+    """Per-file timing rows for a pipeline or batch result."""
+    files = getattr(result, 'files', None) or [result]
+    rows = []
+    for file_result in files:
+        timings = file_result.timings
+        rows.append({
+            'File': file_result.source_name,
+            'Records': len(file_result.df),
+            'Cards': len(file_result.formatted_cards),
+            'Cached': file_result.from_cache,
+            'Read (s)': round(timings.get('read', 0.0), 2),
+            'Group (s)': round(timings.get('group', 0.0), 2),
+            'Format (s)': round(timings.get('format', 0.0), 2),
+            'Total (s)': round(timings.get('total', sum(timings.values())), 2),
+            'Cleaner hits (%)': cleaner_hit_percent(file_result)
+        })
+    return rows
+
+
 def main():
     """Main application function."""
     # Add custom CSS and JS
@@ -185,47 +498,88 @@ def main():
     with st.sidebar:
         st.markdown("## 📁 Upload File")
         
-        uploaded_file = st.file_uploader(
-            "Choose an Excel file",
-            type=['xlsx', 'xls'],
-            help="Upload your travel booking Excel file",
+        uploaded_files = st.file_uploader(
+            "Choose booking files",
+            type=[ext.lstrip('.') for ext in supported_extensions()],
+            accept_multiple_files=True,
+            help="Upload one or more travel booking files (Excel, CSV/TSV, Parquet or Feather)",
             label_visibility="collapsed"
         )
         
-        if uploaded_file is not None:
-            st.info(f"📄 **File:** {uploaded_file.name}")
+        if uploaded_files:
+            for uploaded_file in uploaded_files:
+                st.info(f"📄 **File:** {uploaded_file.name}")
+            read_all_sheets = st.checkbox(
+                "Read all sheets",
+                value=False,
+                help="Process every sheet of the workbook (e.g. one sheet per day)"
+            )
+            sheets = 'all' if read_all_sheets else None
+            
+            date_range = None
+            if st.checkbox("Filter by service date", value=False,
+                           help="Only ingest rows whose service date is in the range"):
+                today = datetime.now().date()
+                selected = st.date_input("Service dates", value=(today, today + timedelta(days=1)))
+                if isinstance(selected, (tuple, list)) and len(selected) == 2:
+                    date_range = tuple(selected)
+                elif selected:
+                    # Range still being picked: filter on the single date
+                    day = selected[0] if isinstance(selected, (tuple, list)) else selected
+                    date_range = (day, day)
+            
+            previous = None
+            last_result = st.session_state.last_result
+            if len(uploaded_files) == 1 and last_result is not None \
+                    and last_result.source_name == uploaded_files[0].name:
+                if st.checkbox("⚡ Only reprocess changed bookings", value=True,
+                               help="Compare with the previous upload of this file: unchanged cards "
+                                    "are reused and new, updated and removed cards are highlighted"):
+                    previous = last_result
+            
+            duplicates = DUPLICATE_CHOICES[st.selectbox(
+                "Duplicate bookings",
+                list(DUPLICATE_CHOICES),
+                help="Rows repeating a PNR + Leg Id are always reported; keep only the first "
+                     "or the latest copy (later row, or later file in a batch)"
+            )]
             
             if st.button("🔄 Process & Format Data", use_container_width=True, type="primary"):
                 with st.spinner("Processing Excel file..."):
-                    df = process_excel_file(uploaded_file)
-                    if df is not None:
-                        st.session_state.df = df
-                        
-                        # Group shared services
-                        grouped_records = group_shared_services(df)
-
-                        # SORT records by pickup time
-                        # First, add sorting key to each record
-                        for record in grouped_records:
-                            record['sort_key'] = get_pickup_time_for_sorting(record)
-
-                        # Sort grouped_records by pickup time
-                        grouped_records.sort(key=lambda x: x['sort_key'])
-
-                        # Format cards based on type (now in sorted order)
-                        formatted_cards = []
-                        for record in grouped_records:
-                            if record['type'] == 'individual':
-                                card_text = create_card_text(record['data'])
-                            else:  # shared
-                                card_text = create_shared_card_text(record)
-                            formatted_cards.append(card_text)
-                        
-                        st.session_state.formatted_cards = formatted_cards
-                        st.session_state.grouped_records = grouped_records  # Store for reference
-                        st.session_state.processing_done = True
+                    if len(uploaded_files) == 1:
+                        result = process_uploaded_file(uploaded_files[0], sheets=sheets, date_range=date_range,
+                                                        duplicates=duplicates, previous=previous)
+                    else:
+                        result = process_uploaded_batch(uploaded_files, sheets=sheets, date_range=date_range,
+                                                         duplicates=duplicates)
+                    if result is not None:
+                        store_result(result, previous, single_file=len(uploaded_files) == 1)
                         st.success("✅ Data processed successfully!")
                         st.rerun()
+        
+        with st.expander("📋 Paste rows from Excel", expanded=False):
+            pasted_text = st.text_area(
+                "Pasted rows",
+                height=150,
+                placeholder="Copy the rows in Excel (header row included) and paste them here",
+                label_visibility="collapsed"
+            )
+            if st.button("📋 Format Pasted Rows", use_container_width=True, disabled=not pasted_text.strip()):
+                result = process_pasted_text(pasted_text)
+                if result is not None:
+                    store_result(result)
+                    st.rerun()
+        
+        if st.session_state.pop('processing_cancelled', False):
+            st.warning("⏹ Processing cancelled")
+        
+        if st.session_state.file_timings:
+            with st.expander("⏱️ Per-file timing", expanded=False):
+                st.dataframe(pd.DataFrame(st.session_state.file_timings), use_container_width=True)
+        
+        show_validation_report(st.session_state.issues)
+    
+    show_column_report(st.session_state.column_report, st.session_state.original_columns)
     
     # Display metrics and cards
     if st.session_state.df is not None and st.session_state.formatted_cards:
@@ -240,7 +594,9 @@ def main():
         st.markdown("### 📋 Formatted Cards")
         display_cards(
             st.session_state.formatted_cards,
-            st.session_state.grouped_records
+            st.session_state.grouped_records,
+            st.session_state.card_status,
+            st.session_state.removed_cards
         )
 
         # Sidebar export options
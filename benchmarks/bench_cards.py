@@ -0,0 +1,58 @@
+"""
+Per-card rendering cost and per-call cost of the regex-based cleaners.
+
+    python -m benchmarks.bench_cards --rows 3000 --repeat 5
+"""
+import argparse
+import os
+import tempfile
+import timeit
+
+from benchmarks.sample_data import write_sample_workbook, SERVICES, PHONES
+from data_processor import normalize_service_name
+from formatter import create_card_text, create_shared_card_text
+from memo import set_cleaner_cache_size
+from pipeline import run_pipeline
+from utils import clean_phone_number, clean_flight_number, clean_name
+
+FLIGHTS = ['EK 501', 'AI-983 / T3', '', 'N/A']
+NAMES = ['MR.  Guest  One', 'mrs. guest two', 'Ms. Guest Three']
+
+
+def per_call(func, values, repeat: int) -> float:
+    """Best microseconds per call of `func` over `values`."""
+    best = min(timeit.repeat(lambda: [func(value) for value in values], number=1, repeat=repeat))
+    return best / len(values) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=3000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), f"vtrack_bench_{args.rows}.xlsx")
+    if not os.path.exists(path):
+        print(f"Writing {path} ...")
+        write_sample_workbook(path, args.rows)
+    records = run_pipeline(path).grouped_records
+    individual = [record['data'] for record in records if record['type'] == 'individual']
+    shared = [record for record in records if record['type'] == 'shared']
+
+    # Time the cleaners themselves, not the memo cache in front of them
+    set_cleaner_cache_size(0)
+    print(f"{'function':<26} {'us/call':>8}")
+    for name, func, values in [
+        ('create_card_text', create_card_text, individual),
+        ('create_shared_card_text', create_shared_card_text, shared),
+        ('normalize_service_name', normalize_service_name, SERVICES * 50),
+        ('clean_phone_number', clean_phone_number, PHONES * 50),
+        ('clean_flight_number', clean_flight_number, FLIGHTS * 50),
+        ('clean_name', clean_name, NAMES * 50),
+    ]:
+        print(f"{name:<26} {per_call(func, values, args.repeat):>8.2f}")
+    print(f"({len(individual):,} individual and {len(shared):,} shared cards)")
+
+
+if __name__ == "__main__":
+    main()
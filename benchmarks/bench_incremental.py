@@ -0,0 +1,54 @@
+"""
+Full vs incremental re-processing of an hourly re-upload with a few edited rows.
+
+    python -m benchmarks.bench_incremental --rows 5000 --changed 0.01
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.sample_data import write_sample_workbook
+from data_processor import read_workbook
+from pipeline import run_pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--changed', type=float, default=0.01, help="Share of rows edited in the re-upload")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), f"vtrack_bench_{args.rows}.xlsx")
+    if not os.path.exists(path):
+        print(f"Writing {path} ...")
+        write_sample_workbook(path, args.rows)
+
+    # CSV copies read fast, so the timings are dominated by grouping
+    first = read_workbook(path)
+    second = first.copy()
+    rng = random.Random(7)
+    for i in rng.sample(range(len(second)), max(1, int(len(second) * args.changed))):
+        second.loc[i, 'Guest Name'] = f"Edited Guest {i}"
+    first_path = os.path.join(tempfile.gettempdir(), "vtrack_bench_upload_1.csv")
+    second_path = os.path.join(tempfile.gettempdir(), "vtrack_bench_upload_2.csv")
+    first.to_csv(first_path, index=False)
+    second.to_csv(second_path, index=False)
+
+    previous = run_pipeline(first_path)
+    start = time.perf_counter()
+    full = run_pipeline(second_path)
+    full_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    incremental = run_pipeline(second_path, previous=previous)
+    incremental_seconds = time.perf_counter() - start
+
+    assert incremental.formatted_cards == full.formatted_cards
+    print(f"{len(full.formatted_cards):,} cards, {args.changed:.1%} of {args.rows:,} rows edited")
+    print(f"full        {full_seconds:8.2f}s  (group {full.timings['group']:.2f}s)")
+    print(f"incremental {incremental_seconds:8.2f}s  (group {incremental.timings['group']:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
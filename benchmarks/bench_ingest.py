@@ -0,0 +1,60 @@
+"""
+Wall-clock and peak-memory comparison of the workbook readers.
+
+    python -m benchmarks.bench_ingest --rows 50000 --extra-columns 40
+
+Each reader runs in a fresh process so its peak RSS is measured in isolation.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from benchmarks.sample_data import write_sample_workbook
+from readers import available_readers
+
+
+def _run_reader(path: str, options: dict):
+    from data_processor import read_workbook
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    df = read_workbook(path, **options)
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux
+    return elapsed, (rss_after - rss_before) / 1024, df.memory_usage(deep=True).sum() / 2**20, df.shape
+
+
+def measure(label: str, path: str, **options):
+    """Read `path` in a child process and print time, peak RSS growth and frame size."""
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        elapsed, peak_mib, frame_mib, shape = pool.apply(_run_reader, (path, options))
+    print(f"{label:<18} {elapsed:8.2f} s   peak +{peak_mib:7.1f} MiB   "
+          f"frame {frame_mib:7.1f} MiB   shape {shape}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--extra-columns', type=int, default=40)
+    parser.add_argument('--path', help="existing workbook to read instead of a synthetic one")
+    args = parser.parse_args()
+
+    path = args.path
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), f"vtrack_bench_{args.rows}x{args.extra_columns}.xlsx")
+        if not os.path.exists(path):
+            print(f"Writing {path} ...")
+            write_sample_workbook(path, args.rows, args.extra_columns)
+    print(f"{path}: {os.path.getsize(path) / 2**20:.1f} MiB")
+
+    for backend in available_readers(path):
+        measure(backend.name, path, reader=backend.name)
+
+
+if __name__ == "__main__":
+    main()
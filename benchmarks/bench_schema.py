@@ -0,0 +1,47 @@
+"""
+Memory of the normalized booking frame before and after the compact schema,
+and group_shared_services time on each.
+
+    python -m benchmarks.bench_schema --rows 20000
+"""
+import argparse
+import os
+import tempfile
+import timeit
+
+from benchmarks.sample_data import write_sample_workbook
+from data_processor import (
+    read_workbook, prepare_bookings, sort_by_service_datetime, apply_booking_schema, group_shared_services
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), f"vtrack_bench_{args.rows}.xlsx")
+    if not os.path.exists(path):
+        print(f"Writing {path} ...")
+        write_sample_workbook(path, args.rows)
+
+    before = sort_by_service_datetime(prepare_bookings(read_workbook(path)))
+    before_usage = before.memory_usage(deep=True, index=False)
+    after = apply_booking_schema(before.copy())
+    after_usage = after.memory_usage(deep=True, index=False)
+
+    print(f"{'column':<16} {'before':>10} {'after':>10}  dtype")
+    for col in before.columns:
+        print(f"{col:<16} {before_usage[col] / 1024:>8.0f}KB {after_usage[col] / 1024:>8.0f}KB  {after[col].dtype.name}")
+    total_before, total_after = before_usage.sum(), after_usage.sum()
+    print(f"{'total':<16} {total_before / 1024 ** 2:>8.1f}MB {total_after / 1024 ** 2:>8.1f}MB"
+          f"  ({total_before / total_after:.1f}x smaller)")
+
+    for label, df in [('plain', before), ('compact', after)]:
+        best = min(timeit.repeat(lambda: group_shared_services(df), number=1, repeat=args.repeat))
+        print(f"group_shared_services on the {label} frame: {best:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
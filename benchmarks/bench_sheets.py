@@ -0,0 +1,40 @@
+"""
+Scaling of multi-sheet ingestion from 1 to 7 sheets, sequential vs process pool.
+
+    python -m benchmarks.bench_sheets --rows 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.sample_data import write_sample_workbook
+from data_processor import ingest_sheets
+from readers import sheet_names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5000, help="rows per sheet")
+    parser.add_argument('--sheets', type=int, default=7)
+    parser.add_argument('--reader', default='auto')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), f"vtrack_bench_{args.sheets}x{args.rows}.xlsx")
+    if not os.path.exists(path):
+        print(f"Writing {path} ...")
+        write_sample_workbook(path, args.rows, sheets=args.sheets)
+    names = sheet_names(path, path)
+
+    print(f"{'sheets':>6} {'sequential':>11} {'pool':>8} {'speedup':>8}")
+    for count in range(1, len(names) + 1):
+        timings = []
+        for workers in (1, count):
+            start = time.perf_counter()
+            ingest_sheets(path, sheets=names[:count], reader=args.reader, max_workers=workers)
+            timings.append(time.perf_counter() - start)
+        print(f"{count:>6} {timings[0]:>10.2f}s {timings[1]:>7.2f}s {timings[0] / timings[1]:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
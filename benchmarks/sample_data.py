@@ -0,0 +1,59 @@
+"""
+Synthetic booking workbooks for benchmarks
+"""
+import os
+import random
+from openpyxl import Workbook
+
+BASE_HEADERS = [
+    'PNR', 'Leg Id', 'Guest Name', 'Whatsapp No', 'Alternate Number', 'Service Name',
+    'Transfer From', 'Transfer To', 'Adult', 'Child', 'Infant', 'Service Date',
+    'Service Type', 'Transfer Type', 'Pickup Time', 'Flight No', 'Vehical Name',
+    'Driver Name', 'Driver Number', 'Vehicle Number', 'Tour Option Name', 'Remarks'
+]
+
+SERVICES = [
+    'Desert Safari XRQT with BBQ Dinner', 'Dubai City Tour', 'Abu Dhabi City Tour With Lunch',
+    'NO KIDDING Burj Khalifa 124th Floor', 'Airport Transfer', 'Dhow Cruise Marina'
+]
+VEHICLES = ['Coaster 22 Seater', 'Hiace 14 Seater', 'Bus 50 Seater', '-']
+DRIVERS = ['Ali Khan', 'Rajesh', 'Imran', 'Suresh']
+DATES = ['2025-01-01', '2025-01-02', '2025-01-03', '04/01/2025']
+TIMES = ['07:00', '07:30:00', '0845', '14:15', '15:00', '']
+PHONES = ['919876543210', '9876543210', 'India 98765 43210', '+91 99887 76655', '']
+
+
+def booking_row(i: int, rng: random.Random, extra_columns: int = 0) -> list:
+    """One booking row; every third row leaves vehicle info blank like merged cells."""
+    merged_continuation = i % 3 != 0
+    row = [
+        f"PNR{rng.randint(100000, 999999)}", str(rng.randint(1, 4)), f"Mr. Guest {i}",
+        rng.choice(PHONES), rng.choice(PHONES), rng.choice(SERVICES),
+        f"Hotel {i % 40}", rng.choice(['', 'Dubai Mall', 'DXB T3']),
+        rng.randint(1, 6), rng.choice([0, 0, 1, 2]), rng.choice([0, 0, 0, 1]),
+        rng.choice(DATES), rng.choice(['SHARING', 'SHARING', 'PRIVATE']), 'Tour',
+        rng.choice(TIMES), rng.choice(['', 'EK 501', 'AI 983']),
+        '' if merged_continuation else rng.choice(VEHICLES),
+        '' if merged_continuation else rng.choice(DRIVERS),
+        '' if merged_continuation else f"97150{rng.randint(1000000, 9999999)}",
+        '' if merged_continuation else f"D {rng.randint(10000, 99999)}",
+        'Standard', ''
+    ]
+    row.extend(f"extra {i}-{k}" for k in range(extra_columns))
+    return row
+
+
+def write_sample_workbook(path: str, rows: int, extra_columns: int = 0,
+                          sheets: int = 1, seed: int = 7) -> str:
+    """Write a synthetic booking workbook (one sheet per `sheets`) and return its path."""
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+    headers = BASE_HEADERS + [f"Extra Column {k}" for k in range(extra_columns)]
+    for sheet_no in range(sheets):
+        ws = wb.create_sheet(f"Day {sheet_no + 1}")
+        ws.append(headers)
+        for i in range(rows):
+            ws.append(booking_row(i, rng, extra_columns))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    wb.save(path)
+    return path
@@ -0,0 +1,272 @@
+"""
+Content-hash keyed cache of pipeline results
+"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, List, Optional
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+
+def compute_cache_key(data: bytes, version: str, settings: Optional[Dict[str, Any]] = None) -> str:
+    """Hash the file content together with the pipeline version and settings."""
+    digest = hashlib.sha256(data)
+    digest.update(version.encode('utf-8'))
+    digest.update(json.dumps(settings or {}, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class PipelineCache:
+    """
+    In-memory LRU cache of pipeline results, optionally spilled to disk.
+    The normalized DataFrame is written as Parquet (pickle when pyarrow is
+    missing); grouped records and cards are pickled next to it.
+    Cached results are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 16, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: str):
+        return key in self._entries or self._disk_paths(key) is not None
+
+    def get(self, key: str):
+        """Return the cached result for `key`, or None."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        result = self._load_from_disk(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, result)
+        return result
+
+    def put(self, key: str, result):
+        """Store a result in memory and, if configured, on disk."""
+        with self._lock:
+            self._remember(key, result)
+        if self.disk_dir:
+            self._save_to_disk(key, result)
+
+    def clear(self):
+        """Drop all in-memory entries (disk files are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key: str, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _frame_path(self, key: str) -> str:
+        ext = '.parquet' if HAS_PARQUET else '.df.pkl'
+        return os.path.join(self.disk_dir, key + ext)
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key + '.pkl')
+
+    def _disk_paths(self, key: str):
+        if not self.disk_dir:
+            return None
+        frame_path, meta_path = self._frame_path(key), self._meta_path(key)
+        if os.path.exists(frame_path) and os.path.exists(meta_path):
+            return frame_path, meta_path
+        return None
+
+    def _save_to_disk(self, key: str, result):
+        frame_path, meta_path = self._frame_path(key), self._meta_path(key)
+        try:
+            if HAS_PARQUET:
+                result.df.to_parquet(frame_path)
+            else:
+                result.df.to_pickle(frame_path)
+            with open(meta_path, 'wb') as f:
+                pickle.dump({k: v for k, v in vars(result).items() if k != 'df'}, f)
+        except Exception:
+            # A failed spill only costs a future re-parse
+            for path in (frame_path, meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _load_from_disk(self, key: str):
+        paths = self._disk_paths(key)
+        if paths is None:
+            return None
+        frame_path, meta_path = paths
+        try:
+            if HAS_PARQUET:
+                df = pd.read_parquet(frame_path)
+            else:
+                df = pd.read_pickle(frame_path)
+            with open(meta_path, 'rb') as f:
+                fields = pickle.load(f)
+        except Exception:
+            return None
+
+        # Imported here to avoid a circular import with pipeline
+        from pipeline import PipelineResult
+        return PipelineResult(df=df, **fields)
+
+
+# Bump when the converted-workbook layout changes, so old conversions are ignored
+CONVERSION_VERSION = "1"
+
+# Converted sheets are stored like spilled result frames
+_FRAME_EXT = '.parquet' if HAS_PARQUET else '.df.pkl'
+
+
+def _write_frame(df: pd.DataFrame, path: str):
+    if HAS_PARQUET:
+        df.to_parquet(path)
+    else:
+        df.to_pickle(path)
+
+
+def _read_frame(path: str) -> pd.DataFrame:
+    return pd.read_parquet(path) if HAS_PARQUET else pd.read_pickle(path)
+
+
+class ConvertedWorkbook:
+    """
+    Sheet names and raw string grids of a workbook parsed by `engine`, read
+    from memory or a cache entry. Readers accept it in place of the file.
+    """
+
+    def __init__(self, sheet_names: List[Any], engine: str, sheets: Optional[Dict[Any, pd.DataFrame]] = None,
+                 entry_dir: Optional[str] = None):
+        self.sheet_names = sheet_names
+        self.engine = engine
+        self._sheets = sheets
+        self._entry_dir = entry_dir
+
+    def __getstate__(self):
+        # Sent to worker processes by its cache entry when it has one, not as grids
+        state = dict(self.__dict__)
+        if state['_entry_dir'] is not None:
+            state['_sheets'] = None
+        return state
+
+    def grid(self, sheet=0) -> pd.DataFrame:
+        """Every row of a sheet (index or name) as raw text, columns 0..n-1."""
+        index = sheet if isinstance(sheet, int) else self.sheet_names.index(sheet)
+        if self._sheets is not None:
+            return self._sheets[self.sheet_names[index]]
+        grid = _read_frame(os.path.join(self._entry_dir, f"{index}{_FRAME_EXT}"))
+        grid.columns = range(grid.shape[1])
+        return grid
+
+
+class ConversionCache:
+    """
+    Disk cache of slow-to-parse workbooks (legacy .xls) converted to columnar
+    files. An entry is a directory named by the content hash holding every
+    sheet as a raw string grid plus the sheet names; reading it back skips
+    the original parser entirely. Once the entries take more than
+    `max_bytes`, the least recently used are evicted.
+    Several processes may share the directory: entries are written under a
+    temporary name and renamed into place.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def workbook(self, data: bytes, engine: str,
+                 convert: Callable[[], Dict[Any, pd.DataFrame]]) -> ConvertedWorkbook:
+        """
+        The converted workbook for `data` parsed by `engine`. On a miss,
+        `convert` returns {sheet name: header=None string grid} for every
+        sheet; the result is stored and returned from memory.
+        """
+        entry_dir = os.path.join(self.cache_dir, compute_cache_key(data, CONVERSION_VERSION, {'engine': engine}))
+        names_path = os.path.join(entry_dir, 'sheets.json')
+        try:
+            with open(names_path, 'r', encoding='utf-8') as f:
+                sheet_names = json.load(f)
+            # Directory mtime tracks use for eviction
+            os.utime(entry_dir)
+            with self._lock:
+                self.hits += 1
+            return ConvertedWorkbook(sheet_names, engine, entry_dir=entry_dir)
+        except (OSError, ValueError):
+            pass
+
+        with self._lock:
+            self.misses += 1
+        sheets = convert()
+        sheet_names = list(sheets)
+        stored = self._store(entry_dir, sheets)
+        return ConvertedWorkbook(sheet_names, engine, sheets=sheets, entry_dir=entry_dir if stored else None)
+
+    def _store(self, entry_dir: str, sheets: Dict[Any, pd.DataFrame]) -> bool:
+        """Write an entry; False when it could not be stored."""
+        temp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+        try:
+            for index, grid in enumerate(sheets.values()):
+                # Columnar formats need string column names
+                _write_frame(grid.set_axis([str(col) for col in grid.columns], axis=1),
+                             os.path.join(temp_dir, f"{index}{_FRAME_EXT}"))
+            with open(os.path.join(temp_dir, 'sheets.json'), 'w', encoding='utf-8') as f:
+                json.dump(list(sheets), f)
+            os.rename(temp_dir, entry_dir)
+        except Exception:
+            # Another process stored it first, or the disk is full: only a future re-parse is lost
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return os.path.isdir(entry_dir)
+        self._evict()
+        # A workbook larger than the whole cache is evicted at once
+        return os.path.isdir(entry_dir)
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith('.tmp-') or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+                entries.append((os.stat(path).st_mtime, size, path))
+            except OSError:
+                continue
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            with self._lock:
+                self.evictions += 1
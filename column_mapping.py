@@ -0,0 +1,244 @@
+"""
+Header -> canonical column mapping: compiled rules, per-signature cache and supplier profiles
+"""
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+from config import COLUMN_PROFILES_PATH
+
+# Ordered rules: the first rule that matches a normalized header wins.
+# Each rule is a list of alternatives; an alternative is a tuple of substrings
+# that must ALL occur in the header.
+COLUMN_RULES = [
+    ('PNR', [('pnr',)]),
+    ('LegId', [('leg',)]),
+    ('GuestName', [('guest',)]),
+    ('WhatsappNo', [('whatsapp',)]),
+    ('AlternateNumber', [('alternate',)]),
+    ('ServiceName', [('servicename',)]),
+    ('TransferFrom', [('transferfrom',)]),
+    ('TransferTo', [('transferto',)]),
+    ('Adult', [('adult',)]),
+    ('Child', [('child',)]),
+    ('Infant', [('infant',)]),
+    ('ServiceDate', [('servicedate',)]),
+    ('ServiceType', [('servicetype',)]),
+    ('TransferType', [('transfertype',)]),
+    ('PickupTime', [('pickup',)]),
+    ('FlightNo', [('flightno',)]),
+    ('VehicalName', [('vehicalname',)]),
+    ('Driver Name', [('drivername',)]),
+    ('Driver Number', [('driver', 'number'), ('drivermobile',)]),
+    ('Vehicle Number', [('vehicle', 'number')]),
+    ('TourOptionName', [('touroption',)]),
+    ('TransferName', [('transfername',)]),
+    ('Remarks', [('remarks',)]),
+]
+
+
+def normalize_header(header) -> str:
+    """Lower-case a header and drop spaces, underscores and dashes."""
+    return str(header).strip().lower().replace(' ', '').replace('_', '').replace('-', '')
+
+
+def _compile_rules(rules) -> Tuple[re.Pattern, Dict[str, str]]:
+    """
+    Compile all rules into one anchored regex. Every rule is a named group of
+    zero-width lookaheads, so alternation order preserves rule priority and
+    `match.lastgroup` names the winning rule.
+    """
+    branches = []
+    group_names = {}
+    for i, (canonical, alternatives) in enumerate(rules):
+        lookaheads = '|'.join(
+            ''.join(f"(?=.*{re.escape(term)})" for term in terms)
+            for terms in alternatives
+        )
+        group = f"r{i}"
+        group_names[group] = canonical
+        branches.append(f"(?P<{group}>(?:{lookaheads}))")
+    return re.compile('^(?:' + '|'.join(branches) + ')', re.DOTALL), group_names
+
+
+_MATCHER, _GROUP_NAMES = _compile_rules(COLUMN_RULES)
+CANONICAL_NAMES = [canonical for canonical, _ in COLUMN_RULES]
+# Mapped when present but never reported as missing
+OPTIONAL_COLUMNS = ('Remarks',)
+
+
+@lru_cache(maxsize=4096)
+def match_column(header) -> Optional[str]:
+    """Canonical name for a single raw header, or None."""
+    match = _MATCHER.match(normalize_header(header))
+    return _GROUP_NAMES[match.lastgroup] if match else None
+
+
+@lru_cache(maxsize=256)
+def compile_mapping(signature: Tuple[str, ...]) -> Dict[str, str]:
+    """
+    Rule-based mapping for a header signature (tuple of stripped raw headers).
+    When several headers resolve to the same canonical column, a header that
+    spells the canonical name exactly wins, else the first one; the others
+    are left unmapped instead of producing duplicate columns.
+    """
+    owners = {}
+    for header in signature:
+        canonical = match_column(header)
+        if canonical is None:
+            continue
+        current = owners.get(canonical)
+        exact = normalize_header(header) == normalize_header(canonical)
+        if current is None or (exact and normalize_header(current) != normalize_header(canonical)):
+            owners[canonical] = header
+    return {header: canonical for canonical, header in owners.items()}
+
+
+def score_header_row(values) -> int:
+    """Number of distinct canonical columns a candidate header row maps to."""
+    matched = set()
+    for value in values:
+        if value is None or (isinstance(value, float) and value != value):
+            continue
+        canonical = match_column(value)
+        if canonical is not None:
+            matched.add(canonical)
+    return len(matched)
+
+
+def detect_header_row(rows: List[list], min_score: int = 3) -> int:
+    """
+    Index of the row that looks most like a header (earliest on ties).
+    Falls back to 0 when no row maps at least `min_score` columns.
+    """
+    best_index, best_score = 0, 0
+    for index, row in enumerate(rows):
+        score = score_header_row(row)
+        if score > best_score:
+            best_index, best_score = index, score
+    return best_index if best_score >= min_score else 0
+
+
+class ColumnProfileStore:
+    """
+    Named supplier layouts persisted as JSON:
+    {"profile name": {"headers": [...], "mapping": {raw: canonical}}}.
+    Known signatures resolve with a dictionary lookup.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        self._by_signature: Dict[Tuple[str, ...], str] = {}
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for name, profile in json.load(f).items():
+                    self._index(name, profile)
+
+    def _index(self, name: str, profile: Dict[str, Any]):
+        self.profiles[name] = profile
+        self._by_signature[tuple(profile['headers'])] = name
+
+    def is_known_header(self, header: str) -> bool:
+        """True when any saved profile maps this header."""
+        return any(header in profile['mapping'] for profile in self.profiles.values())
+
+    def find(self, signature: Tuple[str, ...]) -> Optional[str]:
+        """Name of the profile saved for exactly this header signature."""
+        return self._by_signature.get(signature)
+
+    def save(self, name: str, signature: Tuple[str, ...], mapping: Optional[Dict[str, str]] = None):
+        """Store (or overwrite) a profile and write the store to disk."""
+        profile = {
+            'headers': list(signature),
+            'mapping': dict(mapping if mapping is not None else compile_mapping(signature))
+        }
+        with self._lock:
+            old = self.profiles.get(name)
+            if old is not None:
+                self._by_signature.pop(tuple(old['headers']), None)
+            self._index(name, profile)
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                tmp_path = self.path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.profiles, f, indent=2)
+                os.replace(tmp_path, self.path)
+
+    def closest(self, signature: Tuple[str, ...]) -> Optional[str]:
+        """Profile sharing the most headers with `signature`, if any overlap."""
+        headers = set(signature)
+        best, best_overlap = None, 0
+        for name, profile in self.profiles.items():
+            overlap = len(headers & set(profile['headers']))
+            if overlap > best_overlap:
+                best, best_overlap = name, overlap
+        return best
+
+
+_default_store = None
+
+
+def get_profile_store() -> ColumnProfileStore:
+    """Process-wide profile store at COLUMN_PROFILES_PATH."""
+    global _default_store
+    if _default_store is None:
+        _default_store = ColumnProfileStore(COLUMN_PROFILES_PATH)
+    return _default_store
+
+
+def is_mapped_header(header, store: Optional[ColumnProfileStore] = None) -> bool:
+    """True when a single header maps by rule or by a saved profile."""
+    if match_column(header) is not None:
+        return True
+    return (store or get_profile_store()).is_known_header(str(header).strip())
+
+
+def resolve_mapping(headers: List[Any], store: Optional[ColumnProfileStore] = None) -> Dict[str, str]:
+    """Mapping for a header row: saved profile when known, compiled rules otherwise."""
+    signature = tuple(str(h).strip() for h in headers)
+    store = store or get_profile_store()
+    profile = store.find(signature)
+    if profile is not None:
+        return dict(store.profiles[profile]['mapping'])
+    return dict(compile_mapping(signature))
+
+
+def mapping_report(headers: List[Any], store: Optional[ColumnProfileStore] = None) -> Dict[str, Any]:
+    """
+    Describe how a header row was mapped: the matching profile (if any), the
+    mapping itself, unmapped headers, required columns that were not found,
+    and for unknown layouts the diff against the closest saved profile.
+    """
+    signature = tuple(str(h).strip() for h in headers)
+    store = store or get_profile_store()
+    mapping = resolve_mapping(list(signature), store)
+    profile = store.find(signature)
+
+    report = {
+        'profile': profile,
+        'mapping': mapping,
+        'unmapped': [h for h in signature if h not in mapping],
+        'missing': [
+            c for c in CANONICAL_NAMES
+            if c not in mapping.values() and c not in OPTIONAL_COLUMNS
+        ],
+    }
+
+    if profile is None:
+        closest = store.closest(signature)
+        report['closest_profile'] = closest
+        if closest is not None:
+            known = store.profiles[closest]
+            known_headers = set(known['headers'])
+            report['added_headers'] = [h for h in signature if h not in known_headers]
+            report['removed_headers'] = [h for h in known['headers'] if h not in signature]
+            report['changed_mappings'] = {
+                h: (known['mapping'].get(h), mapping.get(h))
+                for h in signature
+                if h in known_headers and known['mapping'].get(h) != mapping.get(h)
+            }
+    return report
@@ -1,6 +1,54 @@
 """
 Configuration and CSS styles
 """
+import os
+import tempfile
+
+# Pipeline result cache: number of workbooks kept in memory, optional disk spill directory
+CACHE_MAX_ENTRIES = int(os.environ.get("VTRACK_CACHE_MAX_ENTRIES", "16"))
+CACHE_DIR = os.environ.get("VTRACK_CACHE_DIR") or None
+
+# Legacy .xls workbooks converted once to columnar files (keyed by content hash),
+# so later reads skip xlrd; the least recently used are evicted past the size limit.
+# Set the directory to an empty string to disable the conversion cache.
+XLS_CACHE_DIR = os.environ.get("VTRACK_XLS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "vtrack-xls-cache"))
+XLS_CACHE_MAX_BYTES = int(os.environ.get("VTRACK_XLS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Distinct raw values remembered per scalar cleaner (phone, date, time, name, service); 0 disables
+CLEANER_CACHE_SIZE = int(os.environ.get("VTRACK_CLEANER_CACHE_SIZE", "4096"))
+
+# .xlsx uploads at least this large use the streaming read-only reader
+STREAMING_MIN_BYTES = int(os.environ.get("VTRACK_STREAMING_MIN_BYTES", str(2 * 1024 * 1024)))
+
+# Reader backend: 'auto', 'benchmark' (time all backends per file size) or a backend name
+READER_BACKEND = os.environ.get("VTRACK_READER_BACKEND", "auto")
+
+# Parse and keep only the columns the pipeline maps (set to 0 to keep every column)
+PROJECT_COLUMNS = os.environ.get("VTRACK_PROJECT_COLUMNS", "1") != "0"
+
+# Rows scanned when detecting the header row below title banners / blank rows
+HEADER_SCAN_ROWS = int(os.environ.get("VTRACK_HEADER_SCAN_ROWS", "20"))
+
+# Merged-cell handling: 'ffill' forward-fills blank vehicle/grouping cells,
+# 'ranges' fills only the cells an .xlsx sheet actually merges
+MERGED_CELLS = os.environ.get("VTRACK_MERGED_CELLS", "ffill")
+
+# Saved supplier column layouts (header signature -> mapping)
+COLUMN_PROFILES_PATH = os.environ.get(
+    "VTRACK_COLUMN_PROFILES", os.path.join(os.path.expanduser("~"), ".vtrack", "column_profiles.json")
+)
+
+# Uploads at least this large are spooled to a temp file instead of kept in memory
+UPLOAD_SPOOL_BYTES = int(os.environ.get("VTRACK_UPLOAD_SPOOL_BYTES", str(8 * 1024 * 1024)))
+
+# In-memory uploads being processed at once (all sessions); beyond this new uploads are spooled
+UPLOAD_MEMORY_BUDGET = int(os.environ.get("VTRACK_UPLOAD_MEMORY_BUDGET", str(64 * 1024 * 1024)))
+
+# Uploads ingested at the same time across sessions; further uploads wait for a slot
+MAX_CONCURRENT_INGESTS = int(os.environ.get("VTRACK_MAX_CONCURRENT_INGESTS", "2"))
+
+# Directory for spooled uploads (system temp directory when unset)
+UPLOAD_SPOOL_DIR = os.environ.get("VTRACK_UPLOAD_SPOOL_DIR") or None
 
 def get_custom_css():
     """Return custom CSS styles for corporate look."""
@@ -80,6 +128,24 @@ def get_custom_css():
         z-index: 10;
     }
     
+    /* Change badge after an incremental re-upload */
+    .card-status {
+        position: absolute;
+        top: -8px;
+        right: -8px;
+        color: white;
+        height: 24px;
+        border-radius: 12px;
+        display: flex;
+        align-items: center;
+        font-size: 11px;
+        font-weight: bold;
+        font-family: Arial, sans-serif;
+        padding: 0 10px;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.2);
+        z-index: 10;
+    }
+    
     /* Card container */
     .card-container {
         background: transparent;
@@ -1,13 +1,39 @@
 """
 Data processing and grouping logic
 """
+import io
+import itertools
+import mmap
+import os
+import numpy as np
 import pandas as pd
-from typing import Dict, Any, List, Optional
-import re
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from datetime import datetime
-from utils import format_date, clean_time, time_to_minutes, clean_name, clean_phone_number
+from contextlib import contextmanager
+from readers import (
+    select_reader, benchmark_readers, sheet_names, read_merged_ranges, xlsx_header_names, converted_source
+)
+from cache import ConvertedWorkbook
+from column_mapping import resolve_mapping, is_mapped_header, detect_header_row
+from config import HEADER_SCAN_ROWS
+from progress import CancelToken, CountCallback, StageProgress, run_in_pool
+from memo import memoize_cleaner
+from duplicates import ROW_HASH_COLUMN, booking_row_hashes
+from patterns import SERVICE_AFFIXES, XRQT_OR_SPACE, SERVICE_TRAILING_WITH_OR_SYMBOL
+from utils import (
+    format_date, format_dates, parse_dates, clean_time, time_to_minutes, time_to_sortable, clean_name, clean_phone_number,
+    clean_phone_numbers
+)
 
+# Storage for text columns that are not categoricals
+try:
+    import pyarrow  # noqa: F401
+    STRING_STORAGE = 'pyarrow'
+except ImportError:
+    STRING_STORAGE = 'python'
 
+
+@memoize_cleaner
 def normalize_service_name(service_name: str) -> str:
     """Normalize service name for grouping (remove variations)."""
     if not service_name:
@@ -16,32 +42,47 @@ def normalize_service_name(service_name: str) -> str:
     service = str(service_name)
     
     # Remove common prefixes/suffixes
-    service = re.sub(r'^\s*(NO\s+KIDDING\s*)?', '', service, flags=re.IGNORECASE)
-    service = re.sub(r'\s*(TOUR|PACKAGE|WITH\s+LUNCH).*$', '', service, flags=re.IGNORECASE)
-    
-    # Remove XRQT specifically and clean up surrounding text
-    service = re.sub(r'\s*XRQT\s*', ' ', service, flags=re.IGNORECASE)
-    
-    # Clean up any extra spaces created by removing XRQT
-    service = re.sub(r'\s+', ' ', service)
+    service = SERVICE_AFFIXES.sub('', service)
     
-    # Remove any trailing "WITH" that might be left after removing XRQT
-    service = re.sub(r'\s+WITH$', '', service, flags=re.IGNORECASE)
+    # Remove XRQT specifically and clean up any extra spaces around it
+    service = XRQT_OR_SPACE.sub(' ', service)
     
-    # Keep only alphanumeric characters and spaces
-    service = re.sub(r'[^A-Za-z0-9\s]', '', service)
+    # Remove any trailing "WITH" that might be left after removing XRQT, and
+    # keep only alphanumeric characters and spaces
+    service = SERVICE_TRAILING_WITH_OR_SYMBOL.sub('', service)
     
     return service.strip()
 
 
+def normalize_service_names(series: pd.Series) -> pd.Series:
+    """
+    normalize_service_name over a whole column, with identical output:
+    each distinct name is normalized once and the results taken back to
+    the rows, so the cost follows the number of distinct services.
+    """
+    raw = series.to_numpy(dtype=object)
+    codes, uniques = pd.factorize(raw)
+    if pd.api.types.infer_dtype(uniques, skipna=False) not in ('string', 'empty'):
+        # 1 and 1.0 factorize together but normalize differently
+        return pd.Series([normalize_service_name(value) for value in raw], index=series.index, dtype=object)
+    
+    normalized = np.array([normalize_service_name(value) for value in uniques] + [None], dtype=object)[codes]
+    missing = codes == -1
+    if missing.any():
+        # Missing values normalize by kind (None -> "", NaN -> "nan")
+        normalized[missing] = [normalize_service_name(value) for value in raw[missing]]
+    return pd.Series(normalized, index=series.index, dtype=object)
+
+
 def group_by_time_window(df_group, time_window_minutes=45):
     """
     Group rows by time windows (true sliding: any row in group <= window).
+    `df_group` is a frame or a list of row dicts.
     """
-    if len(df_group) <= 1:
-        return [df_group.to_dict('records')]
+    rows = df_group.to_dict('records') if isinstance(df_group, pd.DataFrame) else list(df_group)
+    if len(rows) <= 1:
+        return [rows]
     
-    rows = df_group.to_dict('records')
     rows.sort(key=lambda x: time_to_minutes(x.get('PickupTime', '')))
     
     groups = []
@@ -142,43 +183,98 @@ def process_sharing_group(group_df, grouped_records):
     grouped_records.append(group_data)
 
 
-def group_shared_services(df: pd.DataFrame) -> List[Dict[str, Any]]:
+def _clean_vehicle_info(val):
+    """Vehicle/driver cell value with placeholders ('-', 'N/A', ...) blanked."""
+    if pd.isna(val) or val is None:
+        return ""
+    cleaned = str(val).strip()
+    return "" if cleaned in ['-', 'N/A', 'NA', 'n/a', 'na'] else cleaned
+
+
+def grouping_frame(df: pd.DataFrame, original_positions=None) -> pd.DataFrame:
     """
-    Group passengers who share the same vehicle/driver for tours.
-    Enhanced for handling data from merged cells.
-    FIXED: Added time_window grouping instead of hour-only binning.
+    Copy of the bookings with the helper columns grouping works on:
+    OriginalIndex (row position, or `original_positions` when `df` is part
+    of a larger frame), CleanPickupTime, Clean<vehicle/driver column>,
+    Clean<phone column> (numbers as the cards show them; prepared frames
+    already carry these, see prepare_bookings) and CleanServiceDate (dates
+    as the cards show them).
     """
-    grouped_records = []
-    
-    # Make a copy - preserve original order
     temp_df = df.copy()
     
     # Add original index for sorting
-    temp_df['OriginalIndex'] = range(len(temp_df))
+    temp_df['OriginalIndex'] = range(len(temp_df)) if original_positions is None else original_positions
     
     # Clean and standardize time format
     temp_df['CleanPickupTime'] = temp_df['PickupTime'].apply(clean_time)
     
-    # Clean vehicle/driver info
-    def clean_info(val):
-        if pd.isna(val) or val is None:
-            return ""
-        cleaned = str(val).strip()
-        return "" if cleaned in ['-', 'N/A', 'NA', 'n/a', 'na'] else cleaned
-    
-    vehicle_info_columns = ['VehicalName', 'Driver Name', 'Driver Number', 'Vehicle Number']
-    for col in vehicle_info_columns:
+    for col in VEHICLE_INFO_COLUMNS:
         if col in temp_df.columns:
-            temp_df[f'Clean{col}'] = temp_df[col].apply(clean_info)
+            temp_df[f'Clean{col}'] = temp_df[col].apply(_clean_vehicle_info)
+    
+    for col in PHONE_COLUMNS:
+        if f'Clean{col}' not in temp_df.columns:
+            temp_df[f'Clean{col}'] = clean_phone_numbers(temp_df[col]) if col in temp_df.columns else ""
+    
+    temp_df['CleanServiceDate'] = format_dates(temp_df['ServiceDate']) if 'ServiceDate' in temp_df.columns else ""
+    return temp_df
+
+
+def is_sharing_service(df: pd.DataFrame) -> pd.Series:
+    """Rows whose ServiceType is SHARING (grouped per vehicle instead of one card each)."""
+    return df['ServiceType'].astype(str).str.strip().str.upper() == 'SHARING'
+
+
+def sharing_group_keys(sharing_df: pd.DataFrame) -> List[tuple]:
+    """
+    Vehicle group key of each sharing row of a grouping_frame: date,
+    vehicle/driver info and service. Rows are split into time windows
+    only within a key, so each key is grouped independently.
+    """
+    def column(name):
+        return sharing_df[name] if name in sharing_df.columns else itertools.repeat('')
+    
+    services = column('ServiceName')
+    if 'ServiceName' in sharing_df.columns:
+        # Normalized once per distinct service, not per row
+        services = normalize_service_names(services)
+    # REMOVED: hour of CleanPickupTime (rows are split into time windows instead)
+    return list(zip(
+        sharing_df['CleanServiceDate'],
+        column('CleanVehicalName'),
+        column('CleanDriver Name'),
+        column('CleanDriver Number'),
+        column('CleanVehicle Number'),
+        services
+    ))
+
+
+def group_shared_services(df: pd.DataFrame,
+                          on_rows: Optional[CountCallback] = None,
+                          original_positions=None) -> List[Dict[str, Any]]:
+    """
+    Group passengers who share the same vehicle/driver for tours.
+    Enhanced for handling data from merged cells.
+    FIXED: Added time_window grouping instead of hour-only binning.
+    `on_rows` is called with (rows grouped, total rows) as the work advances.
+    `original_positions` gives the rows' positions when `df` holds only some
+    vehicle groups of a larger frame (see incremental.regroup_changed);
+    records then match those of grouping the whole frame.
+    """
+    grouped_records = []
+    
+    # Make a copy - preserve original order
+    temp_df = grouping_frame(df, original_positions)
     
     # STEP 1: Identify SHARING services
-    is_sharing = temp_df['ServiceType'].apply(
-        lambda x: str(x).strip().upper() == 'SHARING'
-    )
+    is_sharing = is_sharing_service(temp_df)
     
     sharing_df = temp_df[is_sharing].copy()
     individual_df = temp_df[~is_sharing]
     
+    total_rows = len(temp_df)
+    grouped_rows = 0
+    
     # Process individual rows
     for index, row in individual_df.iterrows():
         grouped_records.append({
@@ -187,38 +283,32 @@ def group_shared_services(df: pd.DataFrame) -> List[Dict[str, Any]]:
             'row_index': index,
             'sort_index': row['OriginalIndex'] if 'OriginalIndex' in row else index
         })
+        grouped_rows += 1
+        if on_rows is not None and grouped_rows % GROUP_PROGRESS_ROWS == 0:
+            on_rows(grouped_rows, total_rows)
     
     # STEP 2: Group sharing services - FIXED with time window
     if not sharing_df.empty:
         # FIRST: Group by vehicle/driver/service (REMOVED hour binning)
-        grouping_keys = []
-        for _, row in sharing_df.iterrows():
-            vehicle_key = (
-                format_date(row.get('ServiceDate', '')),
-                row.get('CleanVehicalName', ''),
-                row.get('CleanDriver Name', ''),
-                row.get('CleanDriver Number', ''),
-                row.get('CleanVehicle Number', ''),
-                normalize_service_name(row.get('ServiceName', ''))
-                # REMOVED: row.get('CleanPickupTime', '').split(':')[0] 
-            )
-            grouping_keys.append(vehicle_key)
+        sharing_df['GroupKey'] = sharing_group_keys(sharing_df)
         
-        sharing_df['GroupKey'] = grouping_keys
+        # Rows as dicts once: iterating small slices of categorical columns
+        # group by group is slow on the compact schema
+        sharing_rows = sharing_df.to_dict('records')
         
         # Process each vehicle/service group
-        for group_key, group_df in sharing_df.groupby('GroupKey'):
-            group_df = group_df.sort_values('OriginalIndex')
+        for group_key, positions in sharing_df.groupby('GroupKey').indices.items():
+            group_rows = sorted((sharing_rows[i] for i in positions), key=lambda r: r['OriginalIndex'])
             
-            if len(group_df) > 0:
-                first_row = group_df.iloc[0]
+            if len(group_rows) > 0:
+                first_row = group_rows[0]
                 has_vehicle_info = (
                     first_row['CleanVehicalName'] not in ['', '-', 'N/A'] and
                     first_row['CleanDriver Name'] not in ['', '-', 'N/A']
                 )
                 
                 # FIXED: Apply time_window grouping WITHIN each vehicle group
-                time_subgroups = group_by_time_window(group_df.reset_index(drop=True), time_window_minutes=45)
+                time_subgroups = group_by_time_window(group_rows, time_window_minutes=45)
                 
                 for subgroup_df_list in time_subgroups:
                     subgroup_df = pd.DataFrame(subgroup_df_list)
@@ -232,8 +322,8 @@ def group_shared_services(df: pd.DataFrame) -> List[Dict[str, Any]]:
                                 'pnr': str(row.get('PNR', '')).strip(),
                                 'leg_id': str(row.get('LegId', '')).strip(),
                                 'guest_name': clean_name(row.get('GuestName', '')),
-                                'whatsapp_no': clean_phone_number(row.get('WhatsappNo', '')),
-                                'alternate_no': clean_phone_number(row.get('AlternateNumber', '')),
+                                'whatsapp_no': row['CleanWhatsappNo'],
+                                'alternate_no': row['CleanAlternateNumber'],
                                 'adult': int(row.get('Adult', 0)) if pd.notna(row.get('Adult')) else 0,
                                 'child': int(row.get('Child', 0)) if pd.notna(row.get('Child')) else 0,
                                 'infant': int(row.get('Infant', 0)) if pd.notna(row.get('Infant')) else 0,
@@ -252,7 +342,7 @@ def group_shared_services(df: pd.DataFrame) -> List[Dict[str, Any]]:
                             'type': 'shared',
                             'passengers': group_passengers,
                             'common_data': {
-                                'service_date': format_date(first_row.get('ServiceDate', '')),
+                                'service_date': first_row['CleanServiceDate'],
                                 'service_type': str(first_row.get('ServiceType', '')).strip(),
                                 'vehicle_name': first_row['CleanVehicalName'],
                                 'driver_name': first_row['CleanDriver Name'],
@@ -274,6 +364,10 @@ def group_shared_services(df: pd.DataFrame) -> List[Dict[str, Any]]:
                             'row_index': row.name if hasattr(row, 'name') else index,
                             'sort_index': row['OriginalIndex'] if 'OriginalIndex' in row else index
                         })
+            
+            grouped_rows += len(group_rows)
+            if on_rows is not None:
+                on_rows(grouped_rows, total_rows)
     
     # Sort all records by their original order
     grouped_records.sort(key=lambda x: x.get('sort_index', 999999))
@@ -281,206 +375,487 @@ def group_shared_services(df: pd.DataFrame) -> List[Dict[str, Any]]:
     return grouped_records
 
 
-def process_excel_file(uploaded_file) -> Optional[pd.DataFrame]:
+# Canonical columns every downstream step (grouping, formatting) relies on
+REQUIRED_COLUMNS = [
+    'PNR', 'LegId', 'GuestName', 'WhatsappNo', 'AlternateNumber',
+    'ServiceName', 'TransferFrom', 'TransferTo', 'Adult', 'Child', 
+    'Infant', 'ServiceDate', 'ServiceType', 'TransferType', 
+    'PickupTime', 'FlightNo', 'VehicalName', 'Driver Name', 
+    'Driver Number', 'Vehicle Number', 'TourOptionName', 'TransferName'
+]
+
+# Columns that come from merged cells in sharing groups
+VEHICLE_INFO_COLUMNS = ['VehicalName', 'Driver Name', 'Driver Number', 'Vehicle Number']
+PHONE_COLUMNS = ['WhatsappNo', 'AlternateNumber']
+GROUPING_COLUMNS = ['ServiceName', 'ServiceDate', 'PickupTime', 'ServiceType', 'TourOptionName']
+
+# Helper columns prepare_bookings adds for later steps (not shown in data tables)
+INTERNAL_COLUMNS = [ROW_HASH_COLUMN] + [f'Clean{col}' for col in PHONE_COLUMNS]
+
+# DataFrame.attrs key carrying a sheet's merged ranges from read_workbook to prepare_bookings
+MERGED_RANGES_ATTR = 'merged_ranges'
+
+# Repetitive text columns stored as categoricals in the normalized frame
+CATEGORY_COLUMNS = [
+    'ServiceName', 'ServiceType', 'TransferType', 'TransferFrom', 'TransferTo',
+    'TourOptionName', 'TransferName', 'PickupTime', 'VehicalName', 'Driver Name',
+    'Driver Number', 'Vehicle Number', 'SheetName', 'SourceFile'
+]
+PAX_COLUMNS = ['Adult', 'Child', 'Infant']
+PAX_DTYPE = 'int16'
+
+# Progress callback receives (percent 0-100, status message)
+ProgressCallback = Callable[[int, str], None]
+
+# prepare_bookings steps reported in the 'clean' progress stage
+CLEAN_STEPS = 4
+# Individual rows grouped between progress updates
+GROUP_PROGRESS_ROWS = 500
+
+
+def get_source_name(source, filename: Optional[str] = None) -> str:
+    """Best-effort file name for a path, bytes buffer or uploaded file object."""
+    if filename:
+        return str(filename)
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return str(getattr(source, 'name', '') or '')
+
+
+def read_source_bytes(source) -> bytes:
+    """Return the raw bytes of a path, bytes buffer or file-like object."""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read()
+    if hasattr(source, 'getvalue'):
+        return source.getvalue()
+
+    # Generic file object: read from the start and rewind for later readers
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    data = source.read()
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return data
+
+
+@contextmanager
+def source_buffer(source):
     """
-    Process uploaded Excel file with special handling for merged cells.
-    Merged cells in sharing groups typically have vehicle/driver info only in the first row.
+    Bytes-like view of a source's content, e.g. for hashing.
+    Files on disk are memory-mapped rather than read into memory.
+    """
+    if isinstance(source, (str, os.PathLike)) and os.path.getsize(source) > 0:
+        with open(source, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            yield view
+    else:
+        yield read_source_bytes(source)
+
+
+def get_source_size(source) -> int:
+    """Size in bytes of a path, bytes buffer or file-like object (0 if unknown)."""
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if getattr(source, 'size', None) is not None:
+        return int(source.size)
+    if hasattr(source, 'getbuffer'):
+        return source.getbuffer().nbytes
+    return 0
+
+
+def _rewind(source):
+    """Rewind file-like sources so they can be read again."""
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return source
+
+
+def find_header_row(source, backend, scan_rows: int = HEADER_SCAN_ROWS, sheet=0) -> int:
+    """Scan only the first `scan_rows` rows and return the most header-like one."""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    rows = backend.peek(_rewind(source), scan_rows, sheet=sheet)
+    _rewind(source)
+    return detect_header_row(rows)
+
+
+def uses_merged_ranges(filename: str, merged_cells: str) -> bool:
+    """True when merged cells of this file are filled from the sheet's merged ranges."""
+    return merged_cells == 'ranges' and str(filename).lower().endswith('.xlsx')
+
+
+def read_workbook(source, filename: Optional[str] = None, reader: str = 'auto',
+                  project_columns: bool = True, header_row='auto', sheet=0,
+                  merged_cells: str = 'ffill',
+                  on_rows: Optional[CountCallback] = None) -> pd.DataFrame:
     """
-    import streamlit as st
-    import pandas as pd
-    import numpy as np
+    Read one sheet of the raw workbook as strings (the first sheet by default).
+    Accepts a file path, raw bytes or a file-like object (e.g. Streamlit UploadedFile).
+    `reader` names a backend from readers.READER_BACKENDS, 'auto' to pick one
+    by file type and size, or 'benchmark' to time all backends on this file first.
+    With `project_columns`, each header is mapped as soon as it is read and only
+    columns the pipeline uses are parsed and kept.
+    `header_row` is the 0-based header row, or 'auto' to detect it from the
+    first rows (title banners and blank rows above the header are skipped).
+    With merged_cells='ranges', the .xlsx sheet's merged ranges are stored in
+    df.attrs[MERGED_RANGES_ATTR] for prepare_bookings to fill (see
+    merged_frame_ranges).
+    `on_rows` receives (rows read, total or None) from the reader as it goes.
+    `source` may also be a ConvertedWorkbook, read with the engine it was
+    converted by.
+    """
+    name = get_source_name(source, filename)
+    usecols = is_mapped_header if project_columns else None
+    if isinstance(source, ConvertedWorkbook):
+        backend = select_reader(name, preferred=source.engine)
+    else:
+        if reader == 'benchmark' and not isinstance(source, (bytes, bytearray)):
+            source = read_source_bytes(source)
+        backend = select_reader(name, get_source_size(source), 'auto' if reader == 'benchmark' else reader)
+        if reader != 'benchmark':
+            # Header peek and read share one conversion cache lookup
+            source = converted_source(source, backend)
     
-    try:
-        # Show processing status
-        progress_bar = st.sidebar.progress(0)
-        status_text = st.sidebar.empty()
-        
-        status_text.text("📂 Reading Excel file with merged cell handling...")
-        progress_bar.progress(20)
-        
-        # Read Excel file
-        if uploaded_file.name.endswith('.xlsx'):
-            df = pd.read_excel(uploaded_file, engine='openpyxl', dtype=str, header=0)
-        elif uploaded_file.name.endswith('.xls'):
-            df = pd.read_excel(uploaded_file, engine='xlrd', dtype=str, header=0)
-        else:
-            st.error("❌ Please upload an Excel file (.xlsx or .xls)")
+    if header_row == 'auto':
+        header_row = find_header_row(source, backend, sheet=sheet)
+    
+    if reader == 'benchmark':
+        benchmark_readers(source, name, usecols=usecols, header=header_row)
+        backend = select_reader(name, get_source_size(source), reader)
+    
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    
+    df = backend.read(source, usecols=usecols, header=header_row, sheet=sheet, on_rows=on_rows)
+    if uses_merged_ranges(name, merged_cells):
+        headers = xlsx_header_names(_rewind(source), header_row, sheet)
+        ranges = read_merged_ranges(_rewind(source), sheet)
+        _rewind(source)
+        df.attrs[MERGED_RANGES_ATTR] = merged_frame_ranges(list(df.columns), len(df), ranges, header_row, headers)
+    return df
+
+
+def fill_merged_cells(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Handle merged cells by forward-filling vehicle/driver info.
+    This assumes that when vehicle/driver info is in merged cells,
+    the first row of the group has the info and subsequent rows are empty.
+    All fill columns are masked and filled together in one pass.
+    """
+    columns = [col for col in VEHICLE_INFO_COLUMNS + GROUPING_COLUMNS if col in df.columns]
+    if columns:
+        block = df[columns]
+        # Forward fill only non-empty values (skip NaN/empty strings)
+        df[columns] = block.where(block.notna() & ~block.isin(['', ' ', '-'])).ffill()
+    return df
+
+
+def merged_frame_ranges(columns: List[Any], n_rows: int, ranges, header_row: int,
+                        headers: List[Any]) -> List[Tuple[int, int, int, List[int]]]:
+    """
+    Translate merged sheet ranges to frame positions: (top row, bottom row,
+    column of the top-left value, columns to fill). Positions survive column
+    renames, so the fill can run after column mapping.
+    `ranges` are 1-based (min_col, min_row, max_col, max_row) sheet ranges,
+    `header_row` the 0-based header row and `headers` the full (unprojected)
+    header row, used to find each frame column's sheet position.
+    """
+    positions = {name: i + 1 for i, name in enumerate(headers)}
+    frame_columns = {positions[col]: j for j, col in enumerate(columns) if col in positions}
+    # Sheet row (1-based) of frame row 0
+    first_row = header_row + 2
+    
+    frame_ranges = []
+    for min_col, min_row, max_col, max_row in ranges:
+        top, bottom = min_row - first_row, min(max_row - first_row, n_rows - 1)
+        if top < 0 or top > bottom or min_col not in frame_columns:
+            # Part of the header/banner, past the data, or its value was not read
+            continue
+        fill_columns = [frame_columns[col] for col in range(min_col, max_col + 1) if col in frame_columns]
+        frame_ranges.append((top, bottom, frame_columns[min_col], fill_columns))
+    return frame_ranges
+
+
+def fill_merged_ranges(df: pd.DataFrame, frame_ranges) -> pd.DataFrame:
+    """
+    Copy the top-left value of each merged range into the other cells of the
+    range, leaving every other blank cell alone. `frame_ranges` come from
+    merged_frame_ranges.
+    """
+    for top, bottom, value_column, fill_columns in frame_ranges:
+        value = df.iat[top, value_column]
+        for col in fill_columns:
+            df.iloc[top:bottom + 1, col] = value
+    return df
+
+
+def filter_by_service_date(df: pd.DataFrame, date_range, keep_undated: bool = True) -> pd.DataFrame:
+    """
+    Keep rows whose ServiceDate falls in the inclusive (start, end) range.
+    Either bound may be None; rows with no date in them are kept unless
+    `keep_undated` is False, so bad dates never vanish silently. Dates are
+    read per value as the cards read them (utils.parse_dates), so mixed
+    formats in one column filter correctly.
+    """
+    start, end = date_range
+    dates = parse_dates(df['ServiceDate']).dt.normalize()
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= dates >= pd.Timestamp(start)
+    if end is not None:
+        mask &= dates <= pd.Timestamp(end)
+    if keep_undated:
+        mask |= dates.isna()
+    return df[mask]
+
+
+def sort_by_service_datetime(df: pd.DataFrame) -> pd.DataFrame:
+    """Sort bookings by service date first, then by pickup time."""
+    df['SortableTime'] = df['PickupTime'].apply(time_to_sortable)
+    df['SortableDate'] = parse_dates(df['ServiceDate'])
+    
+    df = df.sort_values(['SortableDate', 'SortableTime'])
+    
+    # Remove temporary columns
+    return df.drop(columns=['SortableTime', 'SortableDate'])
+
+
+def parse_dates_exactly(dates: pd.Series) -> Optional[pd.Series]:
+    """
+    Datetime version of a date column, or None when any value does not parse.
+    Each distinct value is parsed on its own, as format_date does, so
+    formatting the parsed dates gives the same text as the raw values.
+    Empty strings become NaT.
+    """
+    parsed = {}
+    for value in dates.unique():
+        if pd.isna(value) or value == '':
+            parsed[value] = pd.NaT
+            continue
+        timestamp = pd.to_datetime(value, errors='coerce')
+        if pd.isna(timestamp) or timestamp.tzinfo is not None:
             return None
-        
-        status_text.text("🔄 Handling merged cells...")
-        progress_bar.progress(40)
-        
-        # Store original columns
-        st.session_state.original_columns = df.columns.tolist()
-        
-        # Clean column names
-        df.columns = [str(col).strip() for col in df.columns]
-        
-        # Standardize column names (same as before)
-        column_mapping = {}
-        for col in df.columns:
-            col_lower = col.lower().replace(' ', '').replace('_', '').replace('-', '')
-            
-            # Map based on common patterns
-            if 'pnr' in col_lower:
-                column_mapping[col] = 'PNR'
-            elif 'legid' in col_lower or 'leg' in col_lower:
-                column_mapping[col] = 'LegId'
-            elif 'guestname' in col_lower or 'guest' in col_lower:
-                column_mapping[col] = 'GuestName'
-            elif 'whatsappno' in col_lower or 'whatsapp' in col_lower:
-                column_mapping[col] = 'WhatsappNo'
-            elif 'alternatenumber' in col_lower or 'alternate' in col_lower:
-                column_mapping[col] = 'AlternateNumber'
-            elif 'servicename' in col_lower:
-                column_mapping[col] = 'ServiceName'
-            elif 'transferfrom' in col_lower:
-                column_mapping[col] = 'TransferFrom'
-            elif 'transferto' in col_lower:
-                column_mapping[col] = 'TransferTo'
-            elif 'adult' in col_lower:
-                column_mapping[col] = 'Adult'
-            elif 'child' in col_lower:
-                column_mapping[col] = 'Child'
-            elif 'infant' in col_lower:
-                column_mapping[col] = 'Infant'
-            elif 'servicedate' in col_lower:
-                column_mapping[col] = 'ServiceDate'
-            elif 'servicetype' in col_lower:
-                column_mapping[col] = 'ServiceType'
-            elif 'transfertype' in col_lower:
-                column_mapping[col] = 'TransferType'
-            elif 'pickuptime' in col_lower or 'pickup' in col_lower:
-                column_mapping[col] = 'PickupTime'
-            elif 'flightno' in col_lower or 'flightNo' in col_lower:
-                column_mapping[col] = 'FlightNo'
-            elif 'vehicalname' in col_lower or 'VehicalName' in col_lower:
-                column_mapping[col] = 'VehicalName'
-            elif 'drivername' in col_lower:
-                column_mapping[col] = 'Driver Name'
-            elif ('driver' in col_lower and 'number' in col_lower) or 'drivermobile' in col_lower:
-                column_mapping[col] = 'Driver Number'
-            elif ('vehicle' in col_lower and 'number' in col_lower) or 'vehicle number' in col_lower:
-                column_mapping[col] = 'Vehicle Number'
-            elif 'touroptionname' in col_lower or 'touroption' in col_lower:
-                column_mapping[col] = 'TourOptionName'
-            elif 'transfername' in col_lower:
-                column_mapping[col] = 'TransferName'
-            elif 'remarks' in col_lower:
-                column_mapping[col] = 'Remarks'
-        
-        # Apply column mapping
-        df.rename(columns=column_mapping, inplace=True)
-        
-        status_text.text("🔍 Detecting and filling merged cells...")
-        progress_bar.progress(60)
-        
-        # Fill missing columns with empty strings
-        required_columns = [
-            'PNR', 'LegId', 'GuestName', 'WhatsappNo', 'AlternateNumber',
-            'ServiceName', 'TransferFrom', 'TransferTo', 'Adult', 'Child', 
-            'Infant', 'ServiceDate', 'ServiceType', 'TransferType', 
-            'PickupTime', 'FlightNo', 'VehicalName', 'Driver Name', 
-            'Driver Number', 'Vehicle Number', 'TourOptionName', 'TransferName'
-        ]
-        
-        for col in required_columns:
-            if col not in df.columns:
-                df[col] = ""
-        
-        # CRITICAL: Handle merged cells by forward-filling vehicle/driver info
-        # This assumes that when vehicle/driver info is in merged cells,
-        # the first row of the group has the info and subsequent rows are empty
-        vehicle_info_columns = ['VehicalName', 'Driver Name', 'Driver Number', 'Vehicle Number']
-        
-        for col in vehicle_info_columns:
-            if col in df.columns:
-                # Forward fill only non-empty values (skip NaN/empty strings)
-                mask = (df[col].notna()) & (df[col] != '') & (df[col] != ' ') & (df[col] != '-')
-                df[col] = df[col].where(mask).ffill()
-        
-        # Also forward fill other common grouping columns
-        grouping_columns = ['ServiceName', 'ServiceDate', 'PickupTime', 'ServiceType', 'TourOptionName']
-        for col in grouping_columns:
-            if col in df.columns:
-                mask = (df[col].notna()) & (df[col] != '') & (df[col] != ' ') & (df[col] != '-')
-                df[col] = df[col].where(mask).ffill()
-        
-        # Convert numeric columns
-        for col in ['Adult', 'Child', 'Infant']:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
-        
-        # Fill all remaining NaN values with empty string
-        df = df.fillna("")
-        
-        status_text.text("✨ Formatting and sorting data...")
-        progress_bar.progress(80)
-        
-        # Sort the dataframe by pickup time
-        def time_to_sortable(t):
-            if pd.isna(t) or not t or str(t).strip() == '':
-                return "99:99"
-            time_str = str(t).strip()
-            if ':' in time_str:
-                parts = time_str.split(':')
-                hours = parts[0].zfill(2)
-                minutes = parts[1][:2].zfill(2) if len(parts) > 1 else "00"
-                return f"{hours}:{minutes}"
-            elif len(time_str) == 4 and time_str.replace(':', '').isdigit():
-                return f"{time_str[:2]}:{time_str[2:]}"
-            else:
-                try:
-                    # Try to parse as float (Excel time)
-                    time_val = float(time_str)
-                    hours = int(time_val * 24)
-                    minutes = int((time_val * 24 * 60) % 60)
-                    return f"{hours:02d}:{minutes:02d}"
-                except:
-                    return "99:99"
-        
-        # Add sortable time column
-        df['SortableTime'] = df['PickupTime'].apply(time_to_sortable)
-        
-        # Sort by date first, then by time
-        df['SortableDate'] = pd.to_datetime(df['ServiceDate'], errors='coerce')
-        
-        # Sort DataFrame by Date, then Time
-        df = df.sort_values(['SortableDate', 'SortableTime'])
-        
-        # Remove temporary columns
-        df = df.drop(columns=['SortableTime', 'SortableDate'])
-        
-        status_text.text("✅ Finalizing processing...")
-        progress_bar.progress(95)
-        
-        st.success(f"✅ Successfully loaded {len(df)} records with merged cell handling")
-        
-        # Display preview of processed data
-        with st.expander("👁️ Preview Processed Data", expanded=False):
-            st.write("First 10 rows after handling merged cells:")
-            st.dataframe(df.head(10), use_container_width=True)
-            
-            # Show vehicle/driver info distribution
-            st.write("Vehicle/Driver Info Distribution:")
-            vehicle_stats = pd.DataFrame({
-                'Column': vehicle_info_columns,
-                'Non-Empty Values': [df[col].astype(bool).sum() for col in vehicle_info_columns if col in df.columns]
-            })
-            st.dataframe(vehicle_stats, use_container_width=True)
-        
-        progress_bar.progress(100)
-        status_text.text("✅ Processing complete!")
-        
-        # Add delay before clearing progress
-        import time
-        time.sleep(0.5)
-        progress_bar.empty()
-        status_text.empty()
-        
-        return df
-        
-    except Exception as e:
-        st.error(f"❌ Error processing Excel file: {str(e)}")
-        st.exception(e)
-        return None
\ No newline at end of file
+        parsed[value] = timestamp
+    return dates.map(parsed).astype('datetime64[ns]')
+
+
+def apply_booking_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a normalized booking frame to its compact in-memory schema:
+    categoricals for repetitive text, small integers for pax counts and
+    datetime for ServiceDate when every date parses (else it stays text).
+    Other text columns keep pandas' string dtype (Arrow-backed when pyarrow
+    is installed). Safe to apply again to an already converted frame.
+    """
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    
+    for col in PAX_COLUMNS:
+        if col in df.columns and df[col].abs().max() <= np.iinfo(PAX_DTYPE).max:
+            df[col] = df[col].astype(PAX_DTYPE)
+    
+    if 'ServiceDate' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['ServiceDate']):
+        dates = parse_dates_exactly(df['ServiceDate'])
+        if dates is not None:
+            df['ServiceDate'] = dates
+    
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=False) == 'string':
+            df[col] = df[col].astype(pd.StringDtype(STRING_STORAGE))
+    return df
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    """Deep memory usage of a frame in bytes."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def prepare_bookings(df: pd.DataFrame,
+                     progress_callback: Optional[ProgressCallback] = None,
+                     date_range=None) -> pd.DataFrame:
+    """
+    Standardize columns, fill merged cells and convert types of a raw booking frame.
+    Merged cells are filled from the sheet's merged ranges when read_workbook
+    stored them (merged_cells='ranges'), else blank cells are forward-filled.
+    With a `date_range`, rows outside it are dropped as soon as ServiceDate is
+    resolved (after the merged-cell fill), before any further work.
+    Each row's duplicate-detection hash, taken before the fill, is stored in
+    ROW_HASH_COLUMN, and phone numbers as the cards show them in
+    Clean<phone column>.
+    """
+    progress = StageProgress.wrap(progress_callback)
+    rows = len(df)
+    progress.update('clean', 0, CLEAN_STEPS, f"🔄 Mapping columns of {rows:,} rows...")
+    
+    # Clean column names
+    df.columns = [str(col).strip() for col in df.columns]
+    df = df.rename(columns=resolve_mapping(list(df.columns)))
+    
+    progress.update('clean', 1, CLEAN_STEPS, f"🔢 Converting pax counts of {rows:,} rows...")
+    
+    # Fill missing columns with empty strings
+    for col in REQUIRED_COLUMNS:
+        if col not in df.columns:
+            df[col] = ""
+    
+    # Convert numeric columns
+    for col in ['Adult', 'Child', 'Infant']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
+    
+    progress.update('clean', 2, CLEAN_STEPS, f"🔍 Filling merged cells in {rows:,} rows...")
+    
+    # Hashed as read, before either fill: a booking re-sent below a merged
+    # group must not pick up its neighbour's vehicle
+    df[ROW_HASH_COLUMN] = booking_row_hashes(df.fillna(""))
+    
+    frame_ranges = df.attrs.pop(MERGED_RANGES_ATTR, None)
+    if frame_ranges is None:
+        df = fill_merged_cells(df)
+    else:
+        df = fill_merged_ranges(df, frame_ranges)
+    
+    if date_range is not None:
+        progress.update('clean', 3, CLEAN_STEPS, f"📅 Filtering {rows:,} rows by service date...")
+        df = filter_by_service_date(df, date_range)
+    
+    # Fill all remaining NaN values with empty string
+    df = df.fillna("")
+    
+    # Cleaned once per column here; grouping, validation and the cards only read them
+    for col in PHONE_COLUMNS:
+        df[f'Clean{col}'] = clean_phone_numbers(df[col])
+    return df
+
+
+def normalize_bookings(df: pd.DataFrame,
+                       progress_callback: Optional[ProgressCallback] = None,
+                       date_range=None) -> pd.DataFrame:
+    """
+    Standardize columns, fill merged cells, convert types and sort a raw booking
+    frame, returning it in the compact schema (see apply_booking_schema).
+    """
+    progress = StageProgress.wrap(progress_callback)
+    df = prepare_bookings(df, progress, date_range)
+    
+    progress.update('clean', CLEAN_STEPS, CLEAN_STEPS, f"✨ Sorting {len(df):,} rows...")
+    
+    return apply_booking_schema(sort_by_service_datetime(df))
+
+
+# Workbook bytes (or path) shared with sheet worker processes (set once per worker)
+_worker_data = None
+
+
+def _init_sheet_worker(data):
+    global _worker_data
+    _worker_data = data
+
+
+def _ingest_sheet(job):
+    """Read and prepare a single sheet; runs in a worker process."""
+    filename, sheet, reader, project_columns, header_row, date_range, merged_cells = job
+    raw_df = read_workbook(_worker_data, filename, reader=reader, project_columns=project_columns,
+                           header_row=header_row, sheet=sheet, merged_cells=merged_cells)
+    original_columns = raw_df.columns.tolist()
+    if not resolve_mapping([str(col).strip() for col in original_columns]):
+        # Not a booking sheet (notes, summary, ...)
+        return original_columns, None
+    
+    df = prepare_bookings(raw_df, date_range=date_range)
+    df['SheetName'] = str(sheet)
+    return original_columns, df
+
+
+def ingest_sheets(source, filename: Optional[str] = None, sheets='all', reader: str = 'auto',
+                  project_columns: bool = True, header_row='auto', date_range=None,
+                  merged_cells: str = 'ffill', max_workers: Optional[int] = None,
+                  progress_callback: Optional[ProgressCallback] = None,
+                  cancel_token: Optional[CancelToken] = None):
+    """
+    Read several sheets of one workbook concurrently in a process pool.
+    Every sheet is mapped and merged-cell filled on its own, so fills never
+    cross sheet boundaries; the frames are concatenated (unsorted) with a
+    SheetName column, keeping each sheet's row labels. Returns (frame, original columns in first-seen order).
+    Progress counts finished sheets; cancellation is checked between sheets.
+    """
+    global _worker_data
+    progress = StageProgress.wrap(progress_callback, cancel_token)
+    on_sheet = progress.counter('read', "📑 Sheets read")
+    name = get_source_name(source, filename)
+    # Workers open files on disk themselves instead of receiving a copy of the bytes
+    data = source if isinstance(source, (str, os.PathLike)) else read_source_bytes(source)
+    if reader != 'benchmark':
+        # A legacy .xls is converted (or found in the cache) once, with the
+        # configured reader, for the sheet listing and every sheet's read
+        data = converted_source(data, select_reader(name, get_source_size(data), reader))
+    if sheets == 'all':
+        sheets = sheet_names(data, name)
+    
+    jobs = [
+        (name, sheet, reader, project_columns, header_row, date_range, merged_cells)
+        for sheet in sheets
+    ]
+    workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+    results = [None] * len(jobs)
+    if workers <= 1:
+        _worker_data = data
+        try:
+            for i, job in enumerate(jobs):
+                progress.check_cancelled()
+                results[i] = _ingest_sheet(job)
+                on_sheet(i + 1, len(jobs))
+        finally:
+            _worker_data = None
+    else:
+        def on_result(i, result):
+            results[i] = result
+            on_sheet(sum(r is not None for r in results), len(jobs))
+        
+        # A cancelled run returns at once; running sheets finish in the background
+        run_in_pool(_ingest_sheet, jobs, progress, on_result, workers,
+                    initializer=_init_sheet_worker, initargs=(data,))
+    
+    original_columns = []
+    frames = []
+    for columns, df in results:
+        original_columns.extend(col for col in columns if col not in original_columns)
+        if df is not None:
+            frames.append(df)
+    
+    if not frames:
+        raise ValueError("No sheet in this workbook has booking columns")
+    # Index labels stay per-sheet data rows, so row numbers in reports match each sheet
+    return pd.concat(frames), original_columns
+
+
+def process_excel_file(source, filename: Optional[str] = None,
+                       progress_callback: Optional[ProgressCallback] = None,
+                       reader: str = 'auto', project_columns: bool = True,
+                       header_row='auto', date_range=None,
+                       merged_cells: str = 'ffill',
+                       cancel_token: Optional[CancelToken] = None) -> pd.DataFrame:
+    """
+    Process an Excel file with special handling for merged cells.
+    Merged cells in sharing groups typically have vehicle/driver info only in the first row.
+    Headless: raises ValueError for unsupported files instead of rendering UI.
+    merged_cells='ranges' fills only the sheet's real merged ranges (.xlsx);
+    'ffill' forward-fills every blank vehicle/grouping cell.
+    Progress follows the rows read and cleaned; a cancelled `cancel_token`
+    raises IngestCancelled at the next chunk.
+    """
+    progress = StageProgress.wrap(progress_callback, cancel_token)
+    progress.update('read', 0, message="📂 Reading Excel file with merged cell handling...")
+    df = read_workbook(source, filename, reader=reader, project_columns=project_columns,
+                       header_row=header_row, merged_cells=merged_cells,
+                       on_rows=progress.counter('read', "📂 Rows read"))
+    
+    df = normalize_bookings(df, progress, date_range)
+    
+    progress(100, "✅ Finalizing processing...")
+    return df
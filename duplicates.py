@@ -0,0 +1,112 @@
+"""
+Duplicate booking detection over hashed PNR+LegId keys and normalized rows
+"""
+import numpy as np
+import pandas as pd
+from typing import Optional, Tuple
+from validation import issue_context, issue_table
+
+DUPLICATE_KEY = ['PNR', 'LegId']
+
+# Columns recording where a row came from rather than what was booked
+SOURCE_COLUMNS = ['SheetName', 'SourceFile']
+
+# Row hash stored on prepared frames (see data_processor.prepare_bookings)
+ROW_HASH_COLUMN = 'RowHash'
+
+# How repeated bookings are resolved; None only flags them
+KEEP_OPTIONS = (None, 'first', 'latest')
+
+DUPLICATE_ISSUES = {
+    'exact': ("Exact duplicate booking", 'warning'),
+    'conflict': ("Conflicting duplicate booking", 'error'),
+}
+
+
+def booking_row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    64-bit hash of each whole booking row (source and hash columns excluded).
+    Values are hashed as text so frames whose dtypes differ still match.
+    """
+    columns = [col for col in df.columns if col not in SOURCE_COLUMNS + [ROW_HASH_COLUMN]]
+    return pd.util.hash_pandas_object(df[columns].astype(str), index=False).to_numpy()
+
+
+def booking_hashes(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    64-bit hashes of each row's PNR+LegId and of the whole row, plus whether
+    the row has both key values. The row hash is the one stored in
+    ROW_HASH_COLUMN, taken before the merged-cell fill, when `df` has it.
+    """
+    keys = pd.DataFrame({
+        col: df[col].astype(str).str.strip() if col in df.columns else ''
+        for col in DUPLICATE_KEY
+    }, index=df.index)
+    has_key = (keys != '').all(axis=1).to_numpy()
+    key_hash = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+    if ROW_HASH_COLUMN in df.columns:
+        row_hash = df[ROW_HASH_COLUMN].to_numpy()
+    else:
+        row_hash = booking_row_hashes(df)
+    return key_hash, row_hash, has_key
+
+
+def find_duplicates(df: pd.DataFrame, keep: Optional[str] = 'first', groups=None) -> pd.DataFrame:
+    """
+    Locate bookings that repeat a PNR+LegId. In each group of rows sharing a
+    key the first row in frame order is kept ('latest' keeps the last one);
+    every other row is a duplicate of it, 'exact' when the whole normalized
+    row matches and 'conflict' when only the key does. Rows missing PNR or
+    LegId are never duplicates.
+    With `groups` (one label per row, e.g. the file it came from), only rows
+    repeating a booking kept in a different group are returned.
+    Returns positions in `df`: position, reference (the kept row) and kind.
+    """
+    if keep not in KEEP_OPTIONS:
+        raise ValueError(f"Unknown duplicate resolution '{keep}'; expected 'first' or 'latest'")
+    key_hash, row_hash, has_key = booking_hashes(df)
+
+    positions = np.flatnonzero(has_key)
+    keys = pd.Series(key_hash[positions])
+    repeated = keys.duplicated(keep=False).to_numpy()
+    positions, keys = positions[repeated], keys[repeated].to_numpy()
+
+    reference = pd.Series(positions).groupby(keys).transform('last' if keep == 'latest' else 'first').to_numpy()
+    duplicate = positions != reference
+    if groups is not None:
+        groups = np.asarray(groups)
+        duplicate &= groups[positions] != groups[reference]
+    positions, reference = positions[duplicate], reference[duplicate]
+
+    kind = np.where(row_hash[positions] == row_hash[reference], 'exact', 'conflict')
+    return pd.DataFrame({'position': positions, 'reference': reference, 'kind': kind})
+
+
+def drop_duplicates(df: pd.DataFrame, found: pd.DataFrame) -> pd.DataFrame:
+    """`df` without the duplicate rows listed by find_duplicates."""
+    keep = np.ones(len(df), dtype=bool)
+    keep[found['position'].to_numpy()] = False
+    return df[keep]
+
+
+def duplicate_issues(df: pd.DataFrame, found: pd.DataFrame, removed: bool = False) -> pd.DataFrame:
+    """
+    Issue rows (see validation.validate_bookings) for the duplicates found in
+    `df`; the Value names the row that was kept.
+    """
+    frames = []
+    for kind, (issue, severity) in DUPLICATE_ISSUES.items():
+        matches = found[found['kind'] == kind]
+        if matches.empty:
+            continue
+        rows = df.iloc[matches['position'].to_numpy()]
+        kept = df.iloc[matches['reference'].to_numpy()]
+        values = 'row ' + pd.Series(kept.index + 1).astype(str)
+        for col in issue_context(df):
+            values = kept[col].astype(str).to_numpy() + ' ' + values
+        label = f"{issue} (removed)" if removed else issue
+        frames.append(issue_table(rows, 'PNR', label, severity, ('Duplicate of ' + values).to_numpy()))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
@@ -1,10 +1,15 @@
 """
 Card formatting functions
 """
-import re
-from typing import Dict, Any
+from typing import Callable, Dict, Any
 from utils import clean_name, clean_phone_number, clean_flight_number, format_date, format_pax_count, clean_time
 import pandas as pd
+from patterns import XRQT_OR_SPACE, CARD_XRQT_OR_TAG, HTML_BREAK, HTML_TAG
+
+
+def _xrqt_or_tag(match) -> str:
+    """XRQT markers become a space, HTML tags disappear."""
+    return ' ' if match.group('xrqt') is not None else ''
 
 
 def get_pickup_time_for_sorting(record: Dict[str, Any]) -> str:
@@ -35,6 +40,18 @@ def get_pickup_time_for_sorting(record: Dict[str, Any]) -> str:
         return record['common_data'].get('pickup_time', '99:99')
 
 
+def cleaned_value(row: Dict[str, Any], column: str, clean: Callable[[Any], str]) -> str:
+    """
+    A booking row's value as cards show it: the Clean<column> computed for
+    the whole column (by prepare_bookings or grouping_frame), else clean()
+    of the raw value.
+    """
+    cleaned = f'Clean{column}'
+    if cleaned in row:
+        return row[cleaned]
+    return clean(row.get(column, ''))
+
+
 def create_shared_card_text(group_data: Dict[str, Any]) -> str:
     """
     Create formatted text for shared tours with COMPLETE info for EACH passenger.
@@ -111,9 +128,8 @@ def create_shared_card_text(group_data: Dict[str, Any]) -> str:
             service_name = common.get('service_name', '')
         
         if service_name:
-            # Clean service text - REMOVE XRQT HERE
-            service_name = re.sub(r'\s*XRQT\s*', ' ', service_name, flags=re.IGNORECASE)
-            service_name = re.sub(r'<[^>]+>', '', service_name)
+            # Clean service text - REMOVE XRQT and tags in one pass
+            service_name = CARD_XRQT_OR_TAG.sub(_xrqt_or_tag, service_name)
             service_name = ' '.join(service_name.split())
             lines.append(f"Service Name : {service_name}")
         
@@ -193,15 +209,14 @@ def create_card_text(row: Dict[str, Any]) -> str:
     pnr = str(row.get('PNR', '')).strip()
     leg_id = str(row.get('LegId', '')).strip()
     guest_name = clean_name(row.get('GuestName', ''))
-    whatsapp_no = clean_phone_number(row.get('WhatsappNo', ''))
-    alternate_no = clean_phone_number(row.get('AlternateNumber', ''))
+    whatsapp_no = cleaned_value(row, 'WhatsappNo', clean_phone_number)
+    alternate_no = cleaned_value(row, 'AlternateNumber', clean_phone_number)
     
     # Get service name - try TourOptionName first, then ServiceName
     service_name = str(row.get('ServiceName', '')).strip()
     
-    # REMOVE XRQT from service name for display
-    service_name = re.sub(r'\s*XRQT\s*', ' ', service_name, flags=re.IGNORECASE)
-    service_name = re.sub(r'\s+', ' ', service_name)  # Clean extra spaces
+    # REMOVE XRQT from service name for display and clean extra spaces
+    service_name = XRQT_OR_SPACE.sub(' ', service_name)
     
     service_text = service_name
     
@@ -215,7 +230,7 @@ def create_card_text(row: Dict[str, Any]) -> str:
     child = int(row.get('Child', 0)) if pd.notna(row.get('Child')) else 0
     infant = int(row.get('Infant', 0)) if pd.notna(row.get('Infant')) else 0
     
-    service_date = format_date(row.get('ServiceDate', ''))
+    service_date = cleaned_value(row, 'ServiceDate', format_date)
     service_type = str(row.get('ServiceType', '')).strip()
     
     pickup_time_raw = row.get('PickupTime', '')
@@ -253,8 +268,9 @@ def create_card_text(row: Dict[str, Any]) -> str:
     
     # Clean service text - remove HTML tags
     if service_text:
-        service_text = re.sub(r'<br\s*/?>', ' ', service_text, flags=re.IGNORECASE)
-        service_text = re.sub(r'<[^>]+>', '', service_text)
+        if '<' in service_text:
+            service_text = HTML_BREAK.sub(' ', service_text)
+            service_text = HTML_TAG.sub('', service_text)
         service_text = ' '.join(service_text.split())
     
     # Build the formatted text EXACTLY as per requirements with proper line breaks
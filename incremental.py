@@ -0,0 +1,175 @@
+"""
+Incremental re-upload: regroup only the bookings that changed since the previous run
+"""
+import numpy as np
+import pandas as pd
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional, Tuple
+from data_processor import grouping_frame, is_sharing_service, sharing_group_keys, group_shared_services
+from progress import CountCallback
+
+# Status of each card against the previous upload
+CARD_ADDED = 'added'
+CARD_CHANGED = 'changed'
+CARD_UNCHANGED = 'unchanged'
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """64-bit hash of every row's values (all columns, compared as text)."""
+    return pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()
+
+
+def grouping_units(df: pd.DataFrame) -> List[Optional[tuple]]:
+    """
+    Vehicle group key of each sharing row (see sharing_group_keys), None for
+    the rows that get a card of their own.
+    """
+    units: List[Optional[tuple]] = [None] * len(df)
+    sharing_positions = np.flatnonzero(is_sharing_service(df).to_numpy())
+    keys = sharing_group_keys(grouping_frame(df.iloc[sharing_positions], sharing_positions))
+    for position, key in zip(sharing_positions, keys):
+        units[position] = key
+    return units
+
+
+def can_regroup_incrementally(previous, df: pd.DataFrame) -> bool:
+    """Whether a previous result's records can be reused for `df` (same columns and dtypes)."""
+    if previous is None or len(previous.grouped_records) != len(previous.formatted_cards):
+        return False
+    return (
+        list(previous.df.columns) == list(df.columns)
+        and previous.df.dtypes.astype(str).tolist() == df.dtypes.astype(str).tolist()
+    )
+
+
+def _moved(record: Dict[str, Any], new_position: Dict[int, int]) -> Dict[str, Any]:
+    """Copy of a previous record with the frame positions it holds updated."""
+    def move(position):
+        # Keep the scalar type (int / numpy int) grouping produced
+        return type(position)(new_position[position])
+
+    moved = dict(record, sort_index=move(record['sort_index']))
+    if record['type'] == 'individual':
+        data = record['data']
+        moved['data'] = dict(data, OriginalIndex=move(data['OriginalIndex']))
+    else:
+        moved['passengers'] = [
+            dict(passenger, row_data=dict(
+                passenger['row_data'], OriginalIndex=move(passenger['row_data']['OriginalIndex'])
+            ))
+            for passenger in record['passengers']
+        ]
+    return moved
+
+
+def regroup_changed(previous, df: pd.DataFrame,
+                    on_rows: Optional[CountCallback] = None) -> Tuple[List[Dict[str, Any]], Dict[int, str]]:
+    """
+    Group `df` reusing the records of a previous PipelineResult wherever
+    nothing changed. Rows are compared by value hash: a vehicle group whose
+    member rows are the same (in the same order) keeps its records, as does
+    an unchanged row with a card of its own; everything else goes through
+    group_shared_services. Records come back in group_shared_services order,
+    identical to grouping the whole frame.
+    Also returns the previous card text of each reused record, by id().
+    """
+    old_hashes, new_hashes = row_hashes(previous.df), row_hashes(df)
+    old_units, new_units = grouping_units(previous.df), grouping_units(df)
+
+    # Member rows of each vehicle group, in frame order
+    old_groups, new_groups = defaultdict(list), defaultdict(list)
+    for groups, units in ((old_groups, old_units), (new_groups, new_units)):
+        for position, key in enumerate(units):
+            if key is not None:
+                groups[key].append(position)
+
+    # Previous records (with their cards) by the group or row they came from
+    old_by_group = defaultdict(list)
+    old_by_row = defaultdict(deque)
+    for record, card in zip(previous.grouped_records, previous.formatted_cards):
+        position = record['sort_index']
+        key = old_units[position]
+        if key is None:
+            old_by_row[old_hashes[position]].append((record, card))
+        else:
+            old_by_group[key].append((record, card))
+
+    records = []
+    rendered = {}
+    regroup = np.zeros(len(df), dtype=bool)
+    for key, positions in new_groups.items():
+        old_positions = old_groups.get(key)
+        if old_positions is not None and old_hashes[old_positions].tolist() == new_hashes[positions].tolist():
+            new_position = dict(zip(old_positions, positions))
+            for record, card in old_by_group[key]:
+                moved = _moved(record, new_position)
+                records.append(moved)
+                rendered[id(moved)] = card
+        else:
+            regroup[positions] = True
+
+    for position, key in enumerate(new_units):
+        if key is not None:
+            continue
+        reusable = old_by_row.get(new_hashes[position])
+        if not reusable:
+            regroup[position] = True
+            continue
+        record, card = reusable.popleft()
+        moved = _moved(record, {record['sort_index']: position})
+        moved['row_index'] = type(record['row_index'])(df.index[position])
+        records.append(moved)
+        rendered[id(moved)] = card
+
+    changed_positions = np.flatnonzero(regroup)
+    if len(changed_positions):
+        records += group_shared_services(df.iloc[changed_positions], on_rows=on_rows,
+                                         original_positions=changed_positions)
+    records.sort(key=lambda x: x.get('sort_index', 999999))
+    return records, rendered
+
+
+def _booking_keys(df: pd.DataFrame) -> set:
+    """PNR+LegId pairs present in a frame."""
+    return set(zip(df['PNR'].astype(str).str.strip(), df['LegId'].astype(str).str.strip()))
+
+
+def _record_bookings(record: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """PNR+LegId pairs shown on a record's card."""
+    if record['type'] == 'individual':
+        data = record['data']
+        return [(str(data.get('PNR', '')).strip(), str(data.get('LegId', '')).strip())]
+    return [(passenger['pnr'], passenger['leg_id']) for passenger in record['passengers']]
+
+
+def card_changes(previous, result) -> Tuple[List[Tuple[str, Optional[int]]], List[str]]:
+    """
+    Compare the cards of `result` with those of the previous upload.
+    Returns, per card, its status and its previous number (1-based, for
+    unchanged cards) - a card is 'unchanged' when the same text was shown
+    before, 'changed' when it carries a PNR+LegId that was on an earlier card,
+    'added' otherwise - and the previous cards whose bookings are all gone.
+    """
+    old_numbers = defaultdict(deque)
+    for number, card in enumerate(previous.formatted_cards, 1):
+        old_numbers[card].append(number)
+    old_bookings = _booking_keys(previous.df)
+
+    statuses = []
+    for record, card in zip(result.grouped_records, result.formatted_cards):
+        if old_numbers.get(card):
+            statuses.append((CARD_UNCHANGED, old_numbers[card].popleft()))
+        elif any(booking in old_bookings for booking in _record_bookings(record)):
+            statuses.append((CARD_CHANGED, None))
+        else:
+            statuses.append((CARD_ADDED, None))
+
+    # Leftover cards whose bookings still exist were replaced by 'changed' ones
+    new_bookings = _booking_keys(result.df)
+    leftover = {number for numbers in old_numbers.values() for number in numbers}
+    removed = [
+        card
+        for number, (record, card) in enumerate(zip(previous.grouped_records, previous.formatted_cards), 1)
+        if number in leftover and not any(booking in new_bookings for booking in _record_bookings(record))
+    ]
+    return statuses, removed
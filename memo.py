@@ -0,0 +1,114 @@
+"""
+Bounded LRU memoization of the scalar cleaners, with hit/miss/eviction counters
+"""
+import threading
+from collections import OrderedDict
+from functools import update_wrapper
+from typing import Any, Callable, Dict, Optional
+import pandas as pd
+from config import CLEANER_CACHE_SIZE
+
+# Key part standing in for NaN-like values, which never equal themselves
+_MISSING = object()
+
+# Every memoized cleaner by name, for stats and resizing
+_CLEANERS: Dict[str, 'MemoizedCleaner'] = {}
+
+
+def _memo_key(value: Any) -> tuple:
+    """
+    Cache key of a raw cell value. The type is part of it: 1, 1.0 and True
+    are equal as dict keys but str() differently.
+    """
+    cls = type(value)
+    if cls is not str and pd.api.types.is_scalar(value) and pd.isna(value):
+        return (cls, _MISSING)
+    return (cls, value)
+
+
+class MemoizedCleaner:
+    """
+    LRU cache around a one-argument cleaner, keyed on the raw value.
+    Unhashable values and cleaners that raise are passed through uncached.
+    `max_entries` 0 disables the cache.
+    """
+
+    def __init__(self, func: Callable[[Any], Any], max_entries: int):
+        update_wrapper(self, func)
+        self.func = func
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __call__(self, value):
+        if self.max_entries <= 0:
+            return self.func(value)
+        key = _memo_key(value)
+        try:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]
+        except TypeError:
+            # Unhashable value
+            return self.func(value)
+
+        result = self.func(value)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def clear(self):
+        """Drop every cached value (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Counters and current number of cached values."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self._entries)}
+
+
+def memoize_cleaner(func: Callable[[Any], Any]) -> MemoizedCleaner:
+    """Decorator: memoize a scalar cleaner under the configured cache size."""
+    cleaner = MemoizedCleaner(func, CLEANER_CACHE_SIZE)
+    _CLEANERS[func.__name__] = cleaner
+    return cleaner
+
+
+def set_cleaner_cache_size(max_entries: int):
+    """Resize (0 disables) and empty every cleaner cache."""
+    for cleaner in _CLEANERS.values():
+        with cleaner._lock:
+            cleaner.max_entries = max_entries
+            cleaner._entries.clear()
+
+
+def cleaner_stats(since: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Counters of every memoized cleaner by name. With `since` (an earlier
+    snapshot) hits, misses and evictions are the calls made after it; they
+    are process-wide, so runs overlapping in other threads are included.
+    """
+    stats = {name: cleaner.stats() for name, cleaner in _CLEANERS.items()}
+    if since:
+        for name, counts in stats.items():
+            for counter in ('hits', 'misses', 'evictions'):
+                counts[counter] -= since.get(name, {}).get(counter, 0)
+    return stats
+
+
+def hit_rate(stats: Dict[str, Dict[str, int]]) -> Optional[float]:
+    """Share of cleaner calls served from cache (None when nothing was called)."""
+    hits = sum(counts['hits'] for counts in stats.values())
+    calls = hits + sum(counts['misses'] for counts in stats.values())
+    return hits / calls if calls else None
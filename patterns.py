@@ -0,0 +1,41 @@
+"""
+Precompiled regular expressions for the cleaning and formatting hot paths
+"""
+import re
+
+# Phone numbers (utils.clean_phone_number / clean_phone_numbers)
+PHONE_COUNTRY_TEXT = re.compile(r'(india|ind)\s*', re.IGNORECASE)
+PHONE_NON_DIAL_CHARS = re.compile(r'[^\d\s\+]')
+NON_DIGITS = re.compile(r'\D')
+
+# Dates: characters format_date keeps before trying its strptime formats
+NON_DATE_CHARS = re.compile(r'[^\d/\-\.]')
+
+WHITESPACE_RUN = re.compile(r'\s+')
+
+# Flight numbers keep word characters, spacing and dashes
+NON_FLIGHT_CHARS = re.compile(r'[^\w\s\-]')
+
+# Service names in grouping keys (data_processor.normalize_service_name).
+# A leading "NO KIDDING" and everything from TOUR/PACKAGE/WITH LUNCH on go
+# in one pass: the prefix alternative only matches at the start, so the
+# suffix is still searched for in what follows it.
+SERVICE_AFFIXES = re.compile(r'^\s*(?:NO\s+KIDDING\s*)?|\s*(?:TOUR|PACKAGE|WITH\s+LUNCH).*$', re.IGNORECASE)
+
+# A trailing WITH and every character that is not a letter, digit or space,
+# in one pass. $ is tested before any symbol is removed, so a WITH that only
+# ends the name once its symbols go is kept, as when the WITH went first.
+# Only WITH ignores case: under IGNORECASE [A-Za-z] would also match e.g. the
+# Kelvin sign.
+SERVICE_TRAILING_WITH_OR_SYMBOL = re.compile(r'(?i:\s+WITH)$|[^A-Za-z0-9\s]')
+
+# Every run of whitespace and XRQT markers becomes one space, in a single
+# pass: what XRQT -> ' ' followed by collapsing whitespace gave (service
+# names in grouping keys and on cards)
+XRQT_OR_SPACE = re.compile(r'\s+(?:XRQT\s*)*|(?:XRQT\s*)+', re.IGNORECASE)
+
+# Shared-card service names: XRQT markers and HTML tags in one pass (the
+# text is whitespace-normalized afterwards)
+CARD_XRQT_OR_TAG = re.compile(r'(?P<xrqt>\s*XRQT\s*)|<[^>]+>', re.IGNORECASE)
+HTML_BREAK = re.compile(r'<br\s*/?>', re.IGNORECASE)
+HTML_TAG = re.compile(r'<[^>]+>')
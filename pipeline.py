@@ -0,0 +1,415 @@
+"""
+Headless ingest -> group -> format pipeline (no Streamlit dependency)
+"""
+import os
+import time
+import dataclasses
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+from data_processor import (
+    ProgressCallback, get_source_name, read_source_bytes, source_buffer, read_workbook,
+    CLEAN_STEPS, prepare_bookings, ingest_sheets, sort_by_service_datetime,
+    apply_booking_schema, group_shared_services
+)
+from cache import PipelineCache, compute_cache_key
+from column_mapping import mapping_report
+from validation import validate_bookings, sort_issues, issue_context
+from duplicates import find_duplicates, drop_duplicates, duplicate_issues
+from incremental import can_regroup_incrementally, regroup_changed
+from progress import CancelToken, CountCallback, StageProgress, run_in_pool
+from memo import cleaner_stats
+from formatter import get_pickup_time_for_sorting, create_card_text, create_shared_card_text
+
+# Bump whenever a change alters the pipeline output, so cached results are invalidated
+PIPELINE_VERSION = "7"
+
+# Cards rendered between progress updates
+FORMAT_PROGRESS_CARDS = 200
+
+# Name pasted rows are processed under; the extension selects the TSV reader
+PASTED_SOURCE_NAME = "pasted.tsv"
+
+# Reader options accepted by run_pipeline / run_batch and their defaults
+DEFAULT_OPTIONS = {
+    'reader': 'auto', 'project_columns': True, 'header_row': 'auto', 'sheets': None, 'date_range': None,
+    'merged_cells': 'ffill', 'duplicates': None
+}
+
+
+@dataclass
+class PipelineResult:
+    """Everything produced by one pipeline run."""
+    df: pd.DataFrame
+    grouped_records: List[Dict[str, Any]]
+    formatted_cards: List[str]
+    original_columns: List[str] = field(default_factory=list)
+    source_name: str = ""
+    timings: Dict[str, float] = field(default_factory=dict)
+    column_report: Dict[str, Any] = field(default_factory=dict)
+    issues: pd.DataFrame = field(default_factory=pd.DataFrame)
+    cleaner_stats: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    from_cache: bool = False
+
+
+@dataclass
+class BatchResult:
+    """Merged output of several files processed together."""
+    df: pd.DataFrame
+    grouped_records: List[Dict[str, Any]]
+    formatted_cards: List[str]
+    files: List[PipelineResult] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+    issues: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+
+def sort_records_by_pickup(grouped_records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Attach a pickup-time sort key to each record and sort by it (stable)."""
+    for record in grouped_records:
+        record['sort_key'] = get_pickup_time_for_sorting(record)
+    grouped_records.sort(key=lambda x: x['sort_key'])
+    return grouped_records
+
+
+def format_cards(grouped_records: List[Dict[str, Any]],
+                 on_cards: Optional[CountCallback] = None,
+                 rendered: Optional[Dict[int, str]] = None) -> List[str]:
+    """
+    Render the card text for each grouped record; `on_cards` gets (rendered, total).
+    `rendered` maps id() of records whose text is already known to that text.
+    """
+    formatted_cards = []
+    for record in grouped_records:
+        if rendered and id(record) in rendered:
+            card_text = rendered[id(record)]
+        elif record['type'] == 'individual':
+            card_text = create_card_text(record['data'])
+        else:  # shared
+            card_text = create_shared_card_text(record)
+        formatted_cards.append(card_text)
+        if on_cards is not None and len(formatted_cards) % FORMAT_PROGRESS_CARDS == 0:
+            on_cards(len(formatted_cards), len(grouped_records))
+    return formatted_cards
+
+
+def run_pipeline(source, filename: Optional[str] = None,
+                 progress_callback: Optional[ProgressCallback] = None,
+                 cache: Optional[PipelineCache] = None,
+                 reader: str = 'auto',
+                 project_columns: bool = True,
+                 header_row='auto',
+                 sheets=None,
+                 date_range=None,
+                 merged_cells: str = 'ffill',
+                 duplicates: Optional[str] = None,
+                 cancel_token: Optional[CancelToken] = None,
+                 previous: Optional[PipelineResult] = None) -> PipelineResult:
+    """
+    Run the full pipeline on a workbook.
+    `source` may be a file path, raw bytes or a file-like object; pass `filename`
+    when the source itself carries no name (e.g. bytes).
+    With a `cache`, identical content is served from it instead of being re-processed.
+    `reader` names the reader backend, 'auto' or 'benchmark'; `project_columns`
+    keeps only the columns the pipeline uses; `header_row` is a 0-based row
+    or 'auto' to detect it (see read_workbook). `sheets` is None for the first
+    sheet only, 'all' or a list of sheet names to ingest in parallel.
+    `date_range` is an inclusive (start, end) pair of dates; rows outside it
+    are dropped during ingestion. `merged_cells` is 'ffill' (forward-fill
+    blank vehicle/grouping cells) or 'ranges' (fill only the sheet's real
+    merged ranges; .xlsx only, other formats fall back to 'ffill').
+    Rows repeating a PNR+LegId are always reported in `issues`; `duplicates`
+    'first' or 'latest' also drops all but the first / last of them before
+    grouping (see duplicates.find_duplicates).
+    Progress follows rows read, cleaned and grouped and cards rendered;
+    cancelling `cancel_token` raises IngestCancelled at the next chunk.
+    `previous` is the result of an earlier upload of the same file: only
+    bookings that changed since are regrouped and re-rendered (see
+    incremental.regroup_changed). The output is the same either way.
+    """
+    progress = StageProgress.wrap(progress_callback, cancel_token)
+    options = {
+        'reader': reader,
+        'project_columns': project_columns,
+        'header_row': header_row,
+        'sheets': sheets,
+        'date_range': date_range,
+        'merged_cells': merged_cells,
+        'duplicates': duplicates
+    }
+    if cache is None:
+        return _run_uncached(source, filename, progress, previous=previous, **options)
+
+    source_name = get_source_name(source, filename)
+    if isinstance(source, (str, os.PathLike)):
+        # Readers open files on disk directly; only the hash maps the content
+        data = source
+    else:
+        data = read_source_bytes(source)
+    with source_buffer(data) as content:
+        key = pipeline_cache_key(content, source_name, options)
+
+    cached = cache.get(key)
+    if cached is not None:
+        progress(100, "⚡ Loaded from cache")
+        return dataclasses.replace(cached, source_name=source_name, from_cache=True)
+
+    result = _run_uncached(data, source_name, progress, previous=previous, **options)
+    cache.put(key, result)
+    return result
+
+
+def run_pasted(text: str, progress_callback: Optional[ProgressCallback] = None,
+               **options) -> PipelineResult:
+    """
+    Run the pipeline on cells copied from a spreadsheet: tab-separated rows,
+    header included, as Excel puts them on the clipboard. They go through
+    the TSV reader, so column mapping, merged-cell fill and grouping are the
+    same as for an uploaded file. Takes the options of run_pipeline.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        raise ValueError("Nothing was pasted")
+    if '\t' not in lines[0]:
+        raise ValueError("Pasted text has no tab-separated columns; copy the cells "
+                         "straight from Excel, header row included")
+    # Excel ends the copied block with a line break; blank lines would be empty rows
+    data = text.strip('\r\n').encode('utf-8')
+    return run_pipeline(data, PASTED_SOURCE_NAME, progress_callback, **options)
+
+
+def pipeline_cache_key(data: bytes, source_name: str, options: Dict[str, Any]) -> str:
+    """Cache key for a file's content under the given pipeline options."""
+    # The extension picks the reader backend, so it is part of the settings
+    settings = dict(options, extension=source_name.lower().rsplit('.', 1)[-1])
+    return compute_cache_key(data, PIPELINE_VERSION, settings)
+
+
+def _run_uncached(source, filename: Optional[str],
+                  progress_callback: Optional[ProgressCallback],
+                  reader: str = 'auto',
+                  project_columns: bool = True,
+                  header_row='auto',
+                  sheets=None,
+                  date_range=None,
+                  merged_cells: str = 'ffill',
+                  duplicates: Optional[str] = None,
+                  previous: Optional[PipelineResult] = None) -> PipelineResult:
+    timings = {}
+    stats_before = cleaner_stats()
+    progress = StageProgress.wrap(progress_callback)
+
+    start = time.perf_counter()
+    progress.update('read', 0, message="📂 Reading Excel file with merged cell handling...")
+    if sheets is None:
+        raw_df = read_workbook(source, filename, reader=reader, project_columns=project_columns,
+                               header_row=header_row, merged_cells=merged_cells,
+                               on_rows=progress.counter('read', "📂 Rows read"))
+        original_columns = raw_df.columns.tolist()
+    else:
+        # Sheets are read and prepared together in worker processes
+        prepared_df, original_columns = ingest_sheets(
+            source, filename, sheets, reader=reader,
+            project_columns=project_columns, header_row=header_row, date_range=date_range,
+            merged_cells=merged_cells, progress_callback=progress
+        )
+    column_report = mapping_report(original_columns)
+    timings['read'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if sheets is None:
+        prepared_df = prepare_bookings(raw_df, progress, date_range)
+    # Duplicates are resolved in ingest order, before sorting reorders the rows
+    found = find_duplicates(prepared_df, keep=duplicates)
+    duplicates_found = duplicate_issues(prepared_df, found, removed=duplicates is not None)
+    if duplicates is not None:
+        prepared_df = drop_duplicates(prepared_df, found)
+    progress.update('clean', CLEAN_STEPS, CLEAN_STEPS, f"✨ Sorting {len(prepared_df):,} rows...")
+    df = apply_booking_schema(sort_by_service_datetime(prepared_df))
+    timings['normalize'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    issues = sort_issues(
+        [validate_bookings(df), duplicates_found],
+        issue_context(df)
+    )
+    timings['validate'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    progress.update('group', 0, message="👥 Grouping shared services...")
+    rendered = {}
+    if can_regroup_incrementally(previous, df):
+        grouped_records, rendered = regroup_changed(
+            previous, df, on_rows=progress.counter('group', "👥 Changed rows grouped")
+        )
+    else:
+        grouped_records = group_shared_services(df, on_rows=progress.counter('group', "👥 Rows grouped"))
+    grouped_records = sort_records_by_pickup(grouped_records)
+    timings['group'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    progress.update('format', 0, message="✅ Formatting cards...")
+    formatted_cards = format_cards(grouped_records, on_cards=progress.counter('format', "✅ Cards rendered"),
+                                   rendered=rendered)
+    timings['format'] = time.perf_counter() - start
+
+    progress(100, "✅ Processing complete!")
+
+    return PipelineResult(
+        df=df,
+        grouped_records=grouped_records,
+        formatted_cards=formatted_cards,
+        original_columns=original_columns,
+        column_report=column_report,
+        issues=issues,
+        source_name=get_source_name(source, filename),
+        timings=timings,
+        cleaner_stats=cleaner_stats(since=stats_before)
+    )
+
+
+def _run_file(job) -> PipelineResult:
+    """Process one file of a batch; runs in a worker process."""
+    data, source_name, options = job
+    start = time.perf_counter()
+    result = _run_uncached(data, source_name, None, **options)
+    result.timings['total'] = time.perf_counter() - start
+    return result
+
+
+def merge_results(results: List[PipelineResult], duplicates: Optional[str] = None) -> BatchResult:
+    """
+    Merge per-file results into one card list.
+    Each file keeps its own grouping (group_shared_services already splits
+    sharing groups by date); the merged records are sorted by pickup time,
+    ties keeping file order, exactly like a single file's records.
+    Bookings repeated across files are reported in `issues`; with
+    `duplicates` 'first' or 'latest' the copies in the other files are
+    dropped and those files regrouped.
+    """
+    results, cross_file_issues = resolve_cross_file_duplicates(results, duplicates)
+
+    frames = []
+    issue_frames = []
+    grouped_records = []
+    for result in results:
+        frames.append(result.df.assign(SourceFile=result.source_name))
+        issue_frames.append(result.issues.assign(SourceFile=result.source_name))
+        for record in result.grouped_records:
+            grouped_records.append(dict(record, source_file=result.source_name))
+    issue_frames.append(cross_file_issues)
+
+    grouped_records.sort(key=lambda x: x['sort_key'])
+    # Categories differ between files, so concat falls back to plain dtypes
+    df = apply_booking_schema(pd.concat(frames, ignore_index=True)) if frames else pd.DataFrame()
+    issue_frames = [frame for frame in issue_frames if not frame.empty]
+    return BatchResult(
+        df=df,
+        grouped_records=grouped_records,
+        formatted_cards=format_cards(grouped_records),
+        files=results,
+        issues=pd.concat(issue_frames, ignore_index=True) if issue_frames else pd.DataFrame()
+    )
+
+
+def resolve_cross_file_duplicates(results: List[PipelineResult], duplicates: Optional[str] = None):
+    """
+    Find bookings kept in one file and repeated in another (files count in
+    batch order, so 'latest' keeps the last file's copy). Returns the
+    results, with duplicates dropped and regrouped when resolving, and the
+    issue rows for them.
+    """
+    if len(results) < 2:
+        return results, pd.DataFrame()
+    # Index labels stay per-file data rows for the issue table
+    combined = pd.concat([result.df.assign(SourceFile=result.source_name) for result in results])
+    file_of_row = np.repeat(np.arange(len(results)), [len(result.df) for result in results])
+    found = find_duplicates(combined, keep=duplicates, groups=file_of_row)
+    issues = duplicate_issues(combined, found, removed=duplicates is not None)
+    if duplicates is None or found.empty:
+        return results, issues
+
+    offsets = np.concatenate([[0], np.cumsum([len(result.df) for result in results])])
+    removed = file_of_row[found['position'].to_numpy()]
+    resolved = []
+    for i, result in enumerate(results):
+        positions = found['position'][removed == i].to_numpy() - offsets[i]
+        if len(positions) == 0:
+            resolved.append(result)
+            continue
+        df = drop_duplicates(result.df, pd.DataFrame({'position': positions}))
+        grouped_records = sort_records_by_pickup(group_shared_services(df))
+        resolved.append(dataclasses.replace(
+            result, df=df, grouped_records=grouped_records, formatted_cards=format_cards(grouped_records)
+        ))
+    return resolved, issues
+
+
+def run_batch(sources: List[Any],
+              progress_callback: Optional[ProgressCallback] = None,
+              cache: Optional[PipelineCache] = None,
+              max_workers: Optional[int] = None,
+              cancel_token: Optional[CancelToken] = None,
+              **options) -> BatchResult:
+    """
+    Run the pipeline on several files, one worker process per file.
+    `sources` holds paths, file-like objects or (source, filename) pairs;
+    `options` override DEFAULT_OPTIONS. Cached files skip the pool.
+    Progress counts finished files; cancellation is checked between files.
+    """
+    progress = StageProgress.wrap(progress_callback, cancel_token)
+    options = dict(DEFAULT_OPTIONS, **options)
+    batch_start = time.perf_counter()
+
+    jobs = []
+    for source in sources:
+        if isinstance(source, tuple):
+            source, source_name = source
+        else:
+            source_name = get_source_name(source)
+        # Workers open files on disk themselves instead of receiving their bytes
+        data = source if isinstance(source, (str, os.PathLike)) else read_source_bytes(source)
+        jobs.append((data, source_name, options))
+
+    results: List[Optional[PipelineResult]] = [None] * len(jobs)
+    keys = []
+    if cache is not None:
+        for data, name, _ in jobs:
+            with source_buffer(data) as content:
+                keys.append(pipeline_cache_key(content, name, options))
+    pending = []
+    for i, job in enumerate(jobs):
+        cached = cache.get(keys[i]) if cache is not None else None
+        if cached is not None:
+            results[i] = dataclasses.replace(cached, source_name=job[1], from_cache=True,
+                                             timings=dict(cached.timings, total=0.0))
+        else:
+            pending.append(i)
+
+    def file_done(i):
+        done = sum(result is not None for result in results)
+        progress(int(90 * done / len(jobs)), f"📂 Processed {jobs[i][1]} ({done} of {len(jobs)} files)")
+
+    workers = min(len(pending), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        for i in pending:
+            progress.check_cancelled()
+            results[i] = _run_file(jobs[i])
+            file_done(i)
+    elif pending:
+        def on_result(position, result):
+            results[pending[position]] = result
+            file_done(pending[position])
+
+        # A cancelled batch returns at once; running files finish in the background
+        run_in_pool(_run_file, [jobs[i] for i in pending], progress, on_result, workers)
+
+    if cache is not None:
+        for i in pending:
+            cache.put(keys[i], results[i])
+
+    progress(95, "✅ Merging cards...")
+    batch = merge_results(results, options['duplicates'])
+    batch.timings['total'] = time.perf_counter() - batch_start
+    progress(100, "✅ Processing complete!")
+    return batch
@@ -0,0 +1,141 @@
+"""
+Row-based progress reporting and cancellation for pipeline runs
+"""
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+# Share of the progress bar (start, end percent) covered by each pipeline stage
+PROGRESS_STAGES: Dict[str, Tuple[int, int]] = {
+    'read': (0, 40),
+    'clean': (40, 50),
+    'group': (50, 85),
+    'format': (85, 100),
+}
+
+# Called with (units done, total units or None when unknown)
+CountCallback = Callable[[int, Optional[int]], None]
+
+
+class IngestCancelled(Exception):
+    """Raised inside a run once its CancelToken has been cancelled."""
+
+
+class CancelToken:
+    """Thread-safe flag that stops a running pipeline at its next progress update."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        """Raise IngestCancelled if the run was cancelled."""
+        if self._event.is_set():
+            raise IngestCancelled("Processing was cancelled")
+
+
+class StageProgress:
+    """
+    Progress of one run, usable wherever a (percent, message) callback is.
+    Stages report units of real work (rows read, cleaned and grouped, cards
+    rendered), mapped onto the stage's slice of the bar. Every update checks
+    the cancel token, so a cancelled run stops at the next chunk.
+    """
+
+    def __init__(self, progress_callback: Optional[Callable[[int, str], None]] = None,
+                 cancel_token: Optional[CancelToken] = None):
+        self.progress_callback = progress_callback
+        self.cancel_token = cancel_token
+
+    @classmethod
+    def wrap(cls, progress_callback=None, cancel_token: Optional[CancelToken] = None) -> 'StageProgress':
+        """Reuse a StageProgress passed down as the callback, else wrap the callback."""
+        if isinstance(progress_callback, StageProgress):
+            return progress_callback
+        return cls(progress_callback, cancel_token)
+
+    def __call__(self, percent: int, message: str):
+        self.check_cancelled()
+        if self.progress_callback is not None:
+            self.progress_callback(percent, message)
+
+    def check_cancelled(self):
+        if self.cancel_token is not None:
+            self.cancel_token.check()
+
+    def update(self, stage: str, done: int, total: Optional[int] = None, message: str = ""):
+        """Report `done` of `total` units of a stage (start of the stage when total is unknown)."""
+        start, end = PROGRESS_STAGES[stage]
+        fraction = min(done / total, 1.0) if total else 0.0
+        self(int(start + (end - start) * fraction), message)
+
+    def counter(self, stage: str, label: str) -> CountCallback:
+        """
+        Callback for code that counts its own units, e.g. a chunked reader.
+        Counts that would not move the bar only check for cancellation.
+        """
+        last_percent = None
+
+        def on_count(done: int, total: Optional[int] = None):
+            nonlocal last_percent
+            if total:
+                start, end = PROGRESS_STAGES[stage]
+                percent = int(start + (end - start) * min(done / total, 1.0))
+                if percent == last_percent and done < total:
+                    self.check_cancelled()
+                    return
+                last_percent = percent
+            of_total = f" of {total:,}" if total else ""
+            self.update(stage, done, total, f"{label}: {done:,}{of_total}")
+        return on_count
+
+
+def collect_futures(futures: Iterable[Future], progress: StageProgress,
+                    on_done: Callable[[Future], None], poll_seconds: float = 0.2):
+    """
+    Wait for pool futures, calling `on_done` as each one finishes and
+    checking for cancellation in between. On cancellation or error, futures
+    that have not started are cancelled before the exception propagates.
+    """
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=poll_seconds, return_when=FIRST_COMPLETED)
+            for future in done:
+                on_done(future)
+            progress.check_cancelled()
+    except BaseException:
+        for future in pending:
+            future.cancel()
+        raise
+
+
+def run_in_pool(func: Callable[[Any], Any], jobs: Sequence[Any], progress: StageProgress,
+                on_result: Callable[[int, Any], None], max_workers: int,
+                initializer: Optional[Callable] = None, initargs: tuple = ()):
+    """
+    Run `func` on every job in a process pool, calling `on_result` with
+    (job position, result) as each one finishes. A cancelled or failed run
+    returns at once, without waiting for the jobs still running: they
+    finish in the background and jobs not started are dropped.
+    """
+    pool = ProcessPoolExecutor(max_workers=max_workers, initializer=initializer, initargs=initargs)
+    completed = True
+    futures = {pool.submit(func, job): i for i, job in enumerate(jobs)}
+
+    def on_done(future):
+        on_result(futures[future], future.result())
+
+    try:
+        collect_futures(futures, progress, on_done)
+    except BaseException:
+        completed = False
+        raise
+    finally:
+        pool.shutdown(wait=completed, cancel_futures=True)
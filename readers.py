@@ -0,0 +1,623 @@
+"""
+Workbook readers and the reader-backend registry
+"""
+import csv
+import io
+import itertools
+import math
+import os
+import posixpath
+import re
+import time
+import zipfile
+from xml.etree import ElementTree
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from config import STREAMING_MIN_BYTES, XLS_CACHE_DIR, XLS_CACHE_MAX_BYTES
+from cache import ConversionCache, ConvertedWorkbook
+
+# Rows buffered before they are turned into a DataFrame chunk
+DEFAULT_CHUNK_SIZE = 5000
+
+# Called by readers with (rows read so far, total rows or None when unknown)
+RowCallback = Callable[[int, Optional[int]], None]
+
+# Strings pd.read_excel treats as missing by default
+NA_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+])
+
+
+def _convert_cell(value: Any):
+    """Convert a raw openpyxl value the same way pd.read_excel(dtype=str) does."""
+    if value is None:
+        return np.nan
+    if isinstance(value, str):
+        return np.nan if value in NA_STRINGS else value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _dedupe_headers(header_row) -> List[Any]:
+    """Name blank headers 'Unnamed: N' and suffix duplicates with .1, .2 like pandas."""
+    headers = []
+    seen = {}
+    for i, value in enumerate(header_row):
+        name = f"Unnamed: {i}" if value is None or value == "" else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        headers.append(name)
+    return headers
+
+
+def _open_xlsx_rows(source, sheet=0):
+    """
+    Open a sheet (index or name) read-only; returns (workbook, values-only row
+    iterator, row count declared by the sheet or None).
+    """
+    from openpyxl import load_workbook
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    wb = load_workbook(source, read_only=True, data_only=True)
+    ws = wb.worksheets[sheet] if isinstance(sheet, int) else wb[sheet]
+    # Some exporters write wrong <dimension> tags; only use them as an estimate
+    declared_rows = ws.max_row
+    ws.reset_dimensions()
+    return wb, ws.iter_rows(values_only=True), declared_rows
+
+
+def read_xlsx_streaming(source, usecols: Optional[Callable[[Any], bool]] = None,
+                        header: int = 0, sheet=0,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        on_rows: Optional[RowCallback] = None) -> pd.DataFrame:
+    """
+    Read one sheet (first by default) of an .xlsx file with openpyxl's read-only, values-only
+    iterator, building the DataFrame chunk by chunk.
+    `usecols` is called with each header and decides whether the column is kept;
+    skipped columns are never converted or stored. `header` is the 0-based
+    sheet row holding the column names; rows above it are skipped.
+    Output matches pd.read_excel(engine='openpyxl', dtype=str, header=header).
+    `on_rows` is called after every chunk with (rows read, estimated total).
+    """
+    wb, rows, declared_rows = _open_xlsx_rows(source, sheet)
+    read_rows = 0
+    try:
+        total = None
+        if on_rows is not None:
+            if not declared_rows:
+                # The exporter wrote no <dimension>; count the rows in the raw XML
+                declared_rows = count_xlsx_rows(source, sheet)
+            total = max(declared_rows - header - 1, 0)
+
+        header_row = next(itertools.islice(rows, header, None), None)
+        if header_row is None:
+            return pd.DataFrame()
+
+        headers = _dedupe_headers(header_row)
+        keep = [i for i, name in enumerate(headers) if usecols is None or usecols(name)]
+        columns = [headers[i] for i in keep]
+
+        chunks = []
+        buffer = []
+        # Blank rows are held back until a non-blank row follows, so trailing
+        # blank rows are dropped like pandas does
+        pending_blank = 0
+        for row in rows:
+            if all(value is None or value == "" for value in row):
+                pending_blank += 1
+                continue
+            if pending_blank:
+                buffer.extend([[np.nan] * len(keep)] * pending_blank)
+                pending_blank = 0
+            buffer.append([_convert_cell(row[i]) if i < len(row) else np.nan for i in keep])
+
+            if len(buffer) >= chunk_size:
+                chunks.append(pd.DataFrame(buffer, columns=columns))
+                read_rows += len(buffer)
+                buffer = []
+                if on_rows is not None:
+                    on_rows(read_rows, total)
+
+        if buffer or not chunks:
+            chunks.append(pd.DataFrame(buffer, columns=columns))
+    finally:
+        wb.close()
+
+    df = pd.concat(chunks, ignore_index=True)
+    if on_rows is not None:
+        on_rows(len(df), len(df))
+    return df
+
+
+def peek_xlsx_streaming(source, nrows: int, sheet=0) -> List[list]:
+    """First `nrows` raw rows of a sheet, without loading the rest."""
+    wb, rows, _ = _open_xlsx_rows(source, sheet)
+    try:
+        return [list(row) for row in itertools.islice(rows, nrows)]
+    finally:
+        wb.close()
+
+
+_SHEET_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+# A <mergeCell ref="A1:B2"/> tag, with or without a namespace prefix
+_MERGE_CELL = re.compile(rb'<(?:\w+:)?mergeCell\s[^>]*?\bref="([A-Za-z]+\d+(?::[A-Za-z]+\d+)?)"')
+# A <row r="12"> tag
+_ROW_NUMBER = re.compile(rb'<(?:\w+:)?row\s[^>]*?\br="(\d+)"')
+# Bytes of sheet XML scanned per read by _scan_sheet_xml
+DEFAULT_SCAN_BYTES = 1024 * 1024
+
+
+def _xlsx_sheet_path(archive: zipfile.ZipFile, sheet) -> str:
+    """Archive path of a sheet (index or name) from workbook.xml and its relationships."""
+    workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+    sheets = workbook.find(f'{{{_SHEET_NS}}}sheets')
+    entries = [(el.get('name'), el.get(f'{{{_REL_NS}}}id')) for el in sheets]
+    if isinstance(sheet, int):
+        rel_id = entries[sheet][1]
+    else:
+        rel_id = dict(entries)[sheet]
+
+    rels = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    for rel in rels.iter(f'{{{_PKG_REL_NS}}}Relationship'):
+        if rel.get('Id') == rel_id:
+            target = rel.get('Target')
+            return target.lstrip('/') if target.startswith('/') else posixpath.normpath('xl/' + target)
+    raise KeyError(f"Sheet {sheet!r} not found")
+
+
+def _scan_sheet_xml(source, sheet, pattern: re.Pattern) -> Iterator[re.Match]:
+    """
+    Regex matches over the raw XML of an .xlsx sheet, scanned in chunks
+    instead of being parsed; a cheap pass next to reading the rows.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with zipfile.ZipFile(source) as archive:
+        with archive.open(_xlsx_sheet_path(archive, sheet)) as sheet_xml:
+            tail = b''
+            while True:
+                chunk = sheet_xml.read(DEFAULT_SCAN_BYTES)
+                if not chunk:
+                    break
+                buffer = tail + chunk
+                last_end = 0
+                for match in pattern.finditer(buffer):
+                    yield match
+                    last_end = match.end()
+                # Keep enough unmatched bytes for a tag split across chunks
+                tail = buffer[max(last_end, len(buffer) - 256):]
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+
+def read_merged_ranges(source, sheet=0) -> List[Tuple[int, int, int, int]]:
+    """Merged cell ranges of an .xlsx sheet as 1-based (min_col, min_row, max_col, max_row)."""
+    from openpyxl.utils.cell import range_boundaries
+    return [
+        range_boundaries(match.group(1).decode('ascii'))
+        for match in _scan_sheet_xml(source, sheet, _MERGE_CELL)
+    ]
+
+
+def count_xlsx_rows(source, sheet=0) -> int:
+    """Number of the last row stored in an .xlsx sheet (blank rows may be omitted)."""
+    last = 0
+    for match in _scan_sheet_xml(source, sheet, _ROW_NUMBER):
+        last = int(match.group(1))
+    return last
+
+
+def xlsx_header_names(source, header: int = 0, sheet=0) -> List[Any]:
+    """Column names of the full header row, in sheet order, as the readers name them."""
+    rows = peek_xlsx_streaming(source, header + 1, sheet)
+    return _dedupe_headers(rows[header]) if len(rows) > header else []
+
+
+# First bytes of an OLE2 compound file, the container of legacy .xls workbooks
+OLE2_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# Conversion cache of this process (created on first use, see get_conversion_cache)
+_conversion_cache: Optional[ConversionCache] = None
+
+
+def get_conversion_cache() -> Optional[ConversionCache]:
+    """Cache of converted .xls workbooks configured in config.py, or None when disabled."""
+    global _conversion_cache
+    if _conversion_cache is None and XLS_CACHE_DIR:
+        _conversion_cache = ConversionCache(XLS_CACHE_DIR, XLS_CACHE_MAX_BYTES)
+    return _conversion_cache
+
+
+def set_conversion_cache(cache: Optional[ConversionCache]):
+    """Use `cache` for converted .xls workbooks in this process."""
+    global _conversion_cache
+    _conversion_cache = cache
+
+
+def _source_head(source, size: int) -> bytes:
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source[:size])
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read(size)
+    head = source.read(size)
+    source.seek(0)
+    return head
+
+
+def _source_content(source) -> bytes:
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read()
+    data = source.read()
+    source.seek(0)
+    return data
+
+
+def converted_workbook(source, engine: str) -> Optional[ConvertedWorkbook]:
+    """
+    A legacy .xls workbook's sheets from the conversion cache, parsing every
+    sheet with `engine` only on the first read of this content. None when
+    the source is not an .xls (OLE2) file or the cache is disabled.
+    """
+    cache = get_conversion_cache()
+    if cache is None or _source_head(source, len(OLE2_MAGIC)) != OLE2_MAGIC:
+        return None
+    data = _source_content(source)
+    # Cells are kept as raw text: header cells are not missing-value converted
+    return cache.workbook(data, engine, lambda: pd.read_excel(
+        io.BytesIO(data), engine=engine, dtype=str, header=None, sheet_name=None, keep_default_na=False
+    ))
+
+
+def converted_source(source, backend: 'ReaderBackend'):
+    """
+    `source` as `backend` should read it. A legacy .xls that backend parses
+    through the conversion cache comes back as its ConvertedWorkbook, so the
+    content is hashed and looked up once and every later header peek, sheet
+    read and sheet listing uses that one entry. Anything else is returned
+    unchanged.
+    """
+    if backend.convert_legacy and not isinstance(source, ConvertedWorkbook):
+        workbook = converted_workbook(source, backend.name)
+        if workbook is not None:
+            return workbook
+    return source
+
+
+def _frame_from_grid(grid: pd.DataFrame, header: int = 0,
+                     usecols: Optional[Callable[[Any], bool]] = None) -> pd.DataFrame:
+    """
+    What pd.read_excel(dtype=str, header=header, usecols=usecols) returns,
+    built from the raw text grid of the sheet. Header cells are named from
+    their text, so a numeric header cell becomes '5' rather than 5.
+    """
+    names = _dedupe_headers(grid.iloc[header].tolist())
+    df = grid.iloc[header + 1:].reset_index(drop=True).set_axis(names, axis=1)
+    if usecols is not None:
+        selected = [name for name in names if usecols(name)]
+        if not selected:
+            # read_excel returns no rows when no column is selected
+            return pd.DataFrame()
+        df = df[selected]
+    return _missing_as_nan(df)
+
+
+def _missing_as_nan(grid: pd.DataFrame) -> pd.DataFrame:
+    """Turn the strings read_excel treats as missing into NaN."""
+    return grid.where(~grid.isin(NA_STRINGS))
+
+
+def _legacy_workbook(source, engine: str, convert_legacy: bool) -> Optional[ConvertedWorkbook]:
+    if isinstance(source, ConvertedWorkbook):
+        return source
+    return converted_workbook(source, engine) if convert_legacy else None
+
+
+def _read_excel(engine: str, convert_legacy: bool = False):
+    """Whole-sheet pandas reader; with `convert_legacy`, .xls files go through the conversion cache."""
+    def read(source, usecols: Optional[Callable[[Any], bool]] = None, header: int = 0,
+             sheet=0, on_rows: Optional[RowCallback] = None) -> pd.DataFrame:
+        workbook = _legacy_workbook(source, engine, convert_legacy)
+        if workbook is not None:
+            df = _frame_from_grid(workbook.grid(sheet), header, usecols)
+        else:
+            df = pd.read_excel(source, engine=engine, dtype=str, header=header, usecols=usecols,
+                               sheet_name=sheet)
+        # Whole-sheet readers can only report once they are done
+        if on_rows is not None:
+            on_rows(len(df), len(df))
+        return df
+    return read
+
+
+def _peek_excel(engine: str, convert_legacy: bool = False):
+    def peek(source, nrows: int, sheet=0) -> List[list]:
+        workbook = _legacy_workbook(source, engine, convert_legacy)
+        if workbook is not None:
+            return _missing_as_nan(workbook.grid(sheet).head(nrows)).values.tolist()
+        # Row i of this frame is what read(header=i) uses as the header row
+        return pd.read_excel(source, engine=engine, dtype=str, header=None, nrows=nrows,
+                             sheet_name=sheet).values.tolist()
+    return peek
+
+
+def read_delimited(source, usecols: Optional[Callable[[Any], bool]] = None,
+                   header: int = 0, sheet=0, sep: str = ',',
+                   chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   on_rows: Optional[RowCallback] = None) -> pd.DataFrame:
+    """
+    Read CSV/TSV text with the same string semantics as the Excel readers (no sheets).
+    The text is parsed `chunk_size` rows at a time, so the parser never
+    holds more than one chunk of raw rows next to the projected frame.
+    `on_rows` is called after every chunk with (rows read, None).
+    """
+    chunks = pd.read_csv(source, sep=sep, dtype=str, header=0, skiprows=header, usecols=usecols,
+                         encoding='utf-8-sig', chunksize=chunk_size)
+    frames = []
+    read_rows = 0
+    with chunks as reader:
+        for frame in reader:
+            frames.append(frame)
+            read_rows += len(frame)
+            if on_rows is not None:
+                on_rows(read_rows, None)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def peek_delimited(source, nrows: int, sheet=0, sep: str = ',') -> List[list]:
+    """First `nrows` raw lines split into fields; line i is read_delimited(header=i)'s header."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r', encoding='utf-8-sig', newline='') as f:
+            lines = list(itertools.islice(f, nrows))
+    else:
+        stream = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+        try:
+            lines = list(itertools.islice(stream, nrows))
+        finally:
+            # Hand the binary buffer back to the caller open
+            stream.detach()
+    return list(csv.reader(lines, delimiter=sep))
+
+
+def _columns_as_text(df: pd.DataFrame) -> pd.DataFrame:
+    """Turn typed columns into text like the Excel readers: integral floats lose '.0', NaN stays NaN."""
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_string_dtype(series):
+            continue
+        if pd.api.types.is_float_dtype(series) and (series.dropna() % 1 == 0).all():
+            series = series.astype('Int64')
+        df[col] = series.astype(str).where(series.notna())
+    return df
+
+
+def _arrow_reader(read_table: Callable[..., pd.DataFrame], read_names: Callable[[Any], List[str]]):
+    """Reader for columnar files: projection happens in the file reader and no header rows exist."""
+    def read(source, usecols: Optional[Callable[[Any], bool]] = None, header: int = 0,
+             sheet=0, on_rows: Optional[RowCallback] = None) -> pd.DataFrame:
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        columns = None
+        if usecols is not None:
+            columns = [name for name in read_names(source) if usecols(name)]
+            if hasattr(source, 'seek'):
+                source.seek(0)
+        df = _columns_as_text(read_table(source, columns=columns))
+        if on_rows is not None:
+            on_rows(len(df), len(df))
+        return df
+
+    def peek(source, nrows: int, sheet=0) -> List[list]:
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        # Column names are the only header row
+        return [read_names(source)]
+    return read, peek
+
+
+def _parquet_names(source) -> List[str]:
+    import pyarrow.parquet as pq
+    return pq.ParquetFile(source).schema_arrow.names
+
+
+def _feather_names(source) -> List[str]:
+    import pyarrow.ipc
+    return pyarrow.ipc.open_file(source).schema.names
+
+
+def _module_available(module: str) -> Callable[[], bool]:
+    def available() -> bool:
+        try:
+            __import__(module)
+            return True
+        except ImportError:
+            return False
+    return available
+
+
+class ReaderBackend:
+    """A named way of turning a file into a raw string DataFrame."""
+
+    def __init__(self, name: str, extensions: Tuple[str, ...],
+                 read: Callable[..., pd.DataFrame],
+                 peek: Callable[..., List[list]],
+                 available: Callable[[], bool] = lambda: True,
+                 streaming: bool = False, convert_legacy: bool = False):
+        self.name = name
+        self.extensions = extensions
+        # read(source, usecols=None, header=0, sheet=0, on_rows=None) -> DataFrame of strings;
+        # on_rows(rows read, total or None) is called as the read progresses
+        self.read = read
+        # peek(source, nrows, sheet=0) -> first raw rows, indexed like read's `header`
+        self.peek = peek
+        self.available = available
+        # Streaming backends iterate rows instead of loading the whole sheet
+        self.streaming = streaming
+        # Legacy .xls files are read through the conversion cache (see converted_source)
+        self.convert_legacy = convert_legacy
+
+    def __repr__(self):
+        return f"ReaderBackend({self.name!r})"
+
+    def supports(self, filename: str) -> bool:
+        return filename.lower().endswith(self.extensions)
+
+
+READER_BACKENDS: Dict[str, ReaderBackend] = {}
+
+
+def register_reader(backend: ReaderBackend) -> ReaderBackend:
+    """Add (or replace) a reader backend in the registry."""
+    READER_BACKENDS[backend.name] = backend
+    return backend
+
+
+register_reader(ReaderBackend('openpyxl', ('.xlsx',), _read_excel('openpyxl'),
+                              _peek_excel('openpyxl'), _module_available('openpyxl')))
+register_reader(ReaderBackend('openpyxl-readonly', ('.xlsx',), read_xlsx_streaming,
+                              peek_xlsx_streaming, _module_available('openpyxl'), streaming=True))
+register_reader(ReaderBackend('xlrd', ('.xls',), _read_excel('xlrd', convert_legacy=True),
+                              _peek_excel('xlrd', convert_legacy=True), _module_available('xlrd'),
+                              convert_legacy=True))
+
+
+def _calamine_available() -> bool:
+    # pandas only knows the calamine engine from 2.2 on
+    major, minor = (int(part) for part in pd.__version__.split('.')[:2])
+    return (major, minor) >= (2, 2) and _module_available('python_calamine')()
+
+
+# Rust-based reader, used when python-calamine is installed
+register_reader(ReaderBackend('calamine', ('.xlsx', '.xls'), _read_excel('calamine', convert_legacy=True),
+                              _peek_excel('calamine', convert_legacy=True), _calamine_available,
+                              convert_legacy=True))
+register_reader(ReaderBackend('csv', ('.csv',), read_delimited, peek_delimited))
+register_reader(ReaderBackend('tsv', ('.tsv', '.txt'),
+                              lambda source, usecols=None, header=0, sheet=0, on_rows=None:
+                                  read_delimited(source, usecols, header, sep='\t', on_rows=on_rows),
+                              lambda source, nrows, sheet=0: peek_delimited(source, nrows, sep='\t')))
+
+# Columnar feeds from the booking engine; string columns arrive Arrow-backed
+register_reader(ReaderBackend('parquet', ('.parquet',),
+                              *_arrow_reader(pd.read_parquet, _parquet_names),
+                              available=_module_available('pyarrow')))
+register_reader(ReaderBackend('feather', ('.feather', '.arrow'),
+                              *_arrow_reader(pd.read_feather, _feather_names),
+                              available=_module_available('pyarrow')))
+
+# Fastest backend measured by benchmark_readers, per (extension, size bucket)
+_BENCHMARK_WINNERS: Dict[Tuple[str, int], str] = {}
+
+
+def _extension(filename: str) -> str:
+    return os.path.splitext(filename.lower())[1]
+
+
+def _size_bucket(size: int) -> int:
+    """Power-of-two size bucket, so one benchmark covers files of similar size."""
+    return int(math.log2(max(size, 1)))
+
+
+def available_readers(filename: str) -> List[ReaderBackend]:
+    """Installed backends that can read `filename`, in registration order."""
+    return [b for b in READER_BACKENDS.values() if b.supports(filename) and b.available()]
+
+
+def supported_extensions() -> List[str]:
+    """File extensions some installed backend can read."""
+    extensions = []
+    for backend in READER_BACKENDS.values():
+        if backend.available():
+            extensions.extend(ext for ext in backend.extensions if ext not in extensions)
+    return extensions
+
+
+def select_reader(filename: str, size: int = 0, preferred: str = 'auto') -> ReaderBackend:
+    """
+    Pick a backend for a file.
+    `preferred` may name a backend; 'auto' uses benchmark results for this size
+    when there are any, else calamine when installed, else the streaming
+    reader for large .xlsx files and the full reader otherwise.
+    """
+    candidates = available_readers(filename)
+    if not candidates:
+        raise ValueError(f"Unsupported file type: {filename or 'unknown'} "
+                         f"(supported: {', '.join(supported_extensions())})")
+    by_name = {b.name: b for b in candidates}
+
+    if preferred not in ('auto', 'benchmark'):
+        if preferred not in by_name:
+            raise ValueError(f"Reader '{preferred}' cannot read {filename}")
+        return by_name[preferred]
+
+    winner = _BENCHMARK_WINNERS.get((_extension(filename), _size_bucket(size)))
+    if winner in by_name:
+        return by_name[winner]
+    if 'calamine' in by_name:
+        return by_name['calamine']
+    if size >= STREAMING_MIN_BYTES and 'openpyxl-readonly' in by_name:
+        return by_name['openpyxl-readonly']
+    return candidates[0]
+
+
+def sheet_names(source, filename: str) -> List[Any]:
+    """
+    Sheet names of a workbook; delimited text has a single unnamed sheet (0).
+    Pass a legacy .xls as its ConvertedWorkbook (see converted_source) to
+    list it from the conversion cache.
+    """
+    if isinstance(source, ConvertedWorkbook):
+        return source.sheet_names
+    ext = _extension(filename)
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    if ext == '.xlsx':
+        from openpyxl import load_workbook
+        wb = load_workbook(source, read_only=True)
+        try:
+            return list(wb.sheetnames)
+        finally:
+            wb.close()
+    if ext == '.xls':
+        import xlrd
+        data = _source_content(source)
+        return xlrd.open_workbook(file_contents=data, on_demand=True).sheet_names()
+    return [0]
+
+
+def benchmark_readers(data: bytes, filename: str,
+                      usecols: Optional[Callable[[Any], bool]] = None,
+                      header: int = 0) -> List[Tuple[str, float]]:
+    """
+    Time every available backend on `data` and remember the fastest for files
+    of this extension and size. Returns (name, seconds) sorted fastest first;
+    backends that fail on the file are left out.
+    """
+    timings = []
+    for backend in available_readers(filename):
+        start = time.perf_counter()
+        try:
+            backend.read(io.BytesIO(data), usecols=usecols, header=header)
+        except Exception:
+            continue
+        timings.append((backend.name, time.perf_counter() - start))
+
+    timings.sort(key=lambda item: item[1])
+    if timings:
+        _BENCHMARK_WINNERS[(_extension(filename), _size_bucket(len(data)))] = timings[0][0]
+    return timings
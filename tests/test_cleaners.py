@@ -0,0 +1,52 @@
+import pytest
+
+from formatter import create_card_text, create_shared_card_text
+from utils import clean_phone_number, format_date, clean_name, clean_flight_number
+
+
+@pytest.mark.parametrize('clean, value, expected', [
+    (clean_phone_number, 'India 98765 43210', '+91 98765 43210'),
+    (clean_phone_number, 'IND-98765-43210', '+91 98765 43210'),
+    (clean_phone_number, '(98765) 43210 ext', '+91 98765 43210'),
+    (clean_phone_number, '+971 50 123 4567', '+97 15012 34567'),
+    (clean_phone_number, '12345', '12345'),
+    (format_date, '2025/01/02', '02-JAN-25'),
+    (format_date, 'Date: 02-01-2025', '02-JAN-25'),
+    (format_date, 'x', 'x'),
+    (clean_name, 'MR.  john   SMITH', 'Mr. john SMITH'),
+    (clean_name, 'mrs.\tAnna\n Lee', 'Mrs. Anna Lee'),
+    (clean_flight_number, 'EK 501 / EK502', 'EK 501  EK502'),
+    (clean_flight_number, 'EK#501\nEK502', 'EK501\nEK502'),
+    (clean_flight_number, 'N/A', ''),
+])
+def test_scalar_cleaners(clean, value, expected):
+    assert clean(value) == expected
+
+
+def service_lines(text):
+    return [line for line in text.split('\n') if line.startswith('Service Name')]
+
+
+@pytest.mark.parametrize('service_name, individual, shared', [
+    ('Desert Safari XRQT  with BBQ', 'Desert Safari with BBQ', 'Desert Safari with BBQ'),
+    ('City<b>Tour</b>  XRQTXRQT end', 'CityTour end', 'CityTour end'),
+    # Individual cards turn line breaks into spaces; shared cards drop every tag
+    ('Burj xrqt\tKhalifa<br/>Top', 'Burj Khalifa Top', 'Burj KhalifaTop'),
+])
+def test_card_service_names(service_name, individual, shared):
+    row = {'PNR': 'P1', 'LegId': '1', 'ServiceName': service_name, 'ServiceDate': '2025-01-02',
+           'PickupTime': '09:00'}
+    assert service_lines(create_card_text(row)) == [f'Service Name : {individual}']
+
+    passenger = {
+        'pnr': 'P1', 'leg_id': '1', 'guest_name': 'Guest', 'whatsapp_no': '', 'alternate_no': '',
+        'adult': 1, 'child': 0, 'infant': 0, 'transfer_from': '', 'transfer_to': '',
+        'service_name': service_name, 'tour_option_name': '', 'pickup_time': '09:00', 'row_data': {},
+    }
+    common = {
+        'service_date': '02-JAN-25', 'service_type': 'SHARING', 'vehicle_name': 'Bus', 'driver_name': '',
+        'driver_number': '', 'vehicle_number': '', 'service_name': service_name, 'pickup_time': '09:00',
+        'group_size': 1,
+    }
+    group = {'passengers': [passenger], 'common_data': common}
+    assert service_lines(create_shared_card_text(group)) == [f'Service Name : {shared}']
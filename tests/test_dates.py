@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import format_date, format_dates, parse_date, parse_dates
+
+COLUMNS = {
+    'iso': ['2025-01-02', '2025-12-31', '2025-02-03 14:30:00', '', np.nan],
+    'excel text': ['02-Jan-25', '31-Dec-25', '02-JAN-2025', 'TBA'],
+    # Day-first numeric dates, some of which read month-first in format_date
+    'ambiguous': ['13/01/2025', '05/01/2025', '01/02/2025', '25/12/2025'],
+    'month first': ['01/13/2025', '1/5/2025', '12/25/2025'],
+    'mixed': ['2025-01-02', '02-Jan-25', '05/01/2025', 'Jan 2, 2025', 45659, None, 'soon'],
+}
+
+
+@pytest.mark.parametrize('values', COLUMNS.values(), ids=COLUMNS.keys())
+def test_column_formatter_matches_the_scalar(values):
+    series = pd.Series(values, dtype=object)
+    assert format_dates(series).tolist() == series.map(format_date).tolist()
+
+
+@pytest.mark.parametrize('values', COLUMNS.values(), ids=COLUMNS.keys())
+def test_parsed_dates_match_the_scalar(values):
+    series = pd.Series(values, dtype=object)
+    expected = [pd.NaT if dt is None else pd.Timestamp(dt) for dt in series.map(parse_date)]
+    assert parse_dates(series).tolist() == pd.to_datetime(pd.Series(expected, dtype=object)).tolist()
+
+
+def test_datetime_columns():
+    series = pd.Series(pd.to_datetime(['2025-01-02', None]))
+    assert format_dates(series).tolist() == ['02-JAN-25', '']
+    assert parse_dates(series).equals(series)
@@ -0,0 +1,31 @@
+import pandas as pd
+
+from data_processor import prepare_bookings
+from duplicates import find_duplicates
+
+COLUMNS = ['PNR', 'Leg Id', 'Guest Name', 'Service Date', 'Service Type', 'Pickup Time', 'Vehical Name', 'Driver Name']
+
+
+def bookings(rows):
+    return prepare_bookings(pd.DataFrame(rows, columns=COLUMNS))
+
+
+def test_exact_resend_below_merged_group_is_exact():
+    df = bookings([
+        ['P1', '1', 'Guest One', '2025-01-01', 'SHARING', '09:00', 'Bus A', 'Ali'],
+        # Merged cells: vehicle and driver come from the row above
+        ['P2', '1', 'Guest Two', '2025-01-01', 'SHARING', '09:00', '', ''],
+        ['P3', '1', 'Guest Three', '2025-01-01', 'SHARING', '11:00', 'Bus B', 'Omar'],
+        # P2 re-sent as it was: the fill gives it Bus B, but it is the same booking
+        ['P2', '1', 'Guest Two', '2025-01-01', 'SHARING', '09:00', '', ''],
+    ])
+    found = find_duplicates(df)
+    assert found[['position', 'reference', 'kind']].values.tolist() == [[3, 1, 'exact']]
+
+
+def test_changed_resend_is_conflict():
+    df = bookings([
+        ['P1', '1', 'Guest One', '2025-01-01', 'SHARING', '09:00', 'Bus A', 'Ali'],
+        ['P1', '1', 'Guest One', '2025-01-02', 'SHARING', '09:00', 'Bus A', 'Ali'],
+    ])
+    assert find_duplicates(df)['kind'].tolist() == ['conflict']
@@ -0,0 +1,56 @@
+import pandas as pd
+
+from data_processor import group_shared_services
+from incremental import regroup_changed, card_changes
+from pipeline import run_pipeline, sort_records_by_pickup
+
+COLUMNS = ['PNR', 'Leg Id', 'Guest Name', 'Service Date', 'Service Type', 'Service Name',
+           'Pickup Time', 'Vehical Name', 'Driver Name', 'Adult']
+
+ROWS = [
+    ['P1', '1', 'Guest One', '2025-01-02', 'SHARING', 'Desert Safari', '14:00', 'Bus A', 'Ali', '2'],
+    ['P2', '1', 'Guest Two', '2025-01-02', 'SHARING', 'Desert Safari', '14:15', '', '', '1'],
+    ['P3', '1', 'Guest Three', '2025-01-02', 'PRIVATE', 'City Tour', '09:00', 'Car', 'Omar', '3'],
+    ['P4', '1', 'Guest Four', '2025-01-02', 'SHARING', 'Dhow Cruise', '19:00', 'Bus B', 'Ravi', '2'],
+    ['P5', '1', 'Guest Five', '2025-01-02', 'SHARING', 'Dhow Cruise', '19:30', '', '', '2'],
+    ['P6', '1', 'Guest Six', '2025-01-03', 'PRIVATE', 'Airport Transfer', '06:00', 'Car', 'Sam', '1'],
+]
+
+
+def run(tmp_path, name, rows, previous=None):
+    path = tmp_path / name
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+    return run_pipeline(str(path), previous=previous)
+
+
+def reupload(tmp_path):
+    first = run(tmp_path, 'v1.csv', ROWS)
+    changed = [row[:] for row in ROWS]
+    # One sharing group changes, one private row is dropped, one booking is added
+    changed[4][2] = 'Guest Five Renamed'
+    del changed[2]
+    changed.append(['P7', '1', 'Guest Seven', '2025-01-03', 'PRIVATE', 'City Tour', '10:00', 'Car', 'Omar', '2'])
+    return first, changed
+
+
+def test_incremental_regroup_matches_full_regroup(tmp_path):
+    first, changed = reupload(tmp_path)
+    incremental = run(tmp_path, 'v2.csv', changed, previous=first)
+    full = run(tmp_path, 'v2.csv', changed)
+    assert incremental.formatted_cards == full.formatted_cards
+    assert repr(incremental.grouped_records) == repr(full.grouped_records)
+
+
+def test_unchanged_groups_reuse_previous_records(tmp_path):
+    first, changed = reupload(tmp_path)
+    full = run(tmp_path, 'v2.csv', changed)
+    records, rendered = regroup_changed(first, full.df)
+    # Reused records still carry the previous run's sort_key until re-sorted
+    expected = sort_records_by_pickup(group_shared_services(full.df))
+    assert repr(sort_records_by_pickup(records)) == repr(expected)
+    # The Desert Safari group and P6's card are reused; the Dhow Cruise group is regrouped
+    assert len(rendered) == 2
+
+    statuses, removed = card_changes(first, full)
+    assert sorted(status for status, _ in statuses) == ['added', 'changed', 'unchanged', 'unchanged']
+    assert len(removed) == 1
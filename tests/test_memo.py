@@ -0,0 +1,65 @@
+import numpy as np
+
+from memo import MemoizedCleaner, cleaner_stats, hit_rate
+from utils import clean_phone_number
+
+
+def counting_cleaner(max_entries):
+    calls = []
+
+    def clean(value):
+        calls.append(value)
+        return str(value).strip()
+
+    return MemoizedCleaner(clean, max_entries), calls
+
+
+def test_repeated_values_are_cleaned_once():
+    clean, calls = counting_cleaner(8)
+    assert [clean(v) for v in [' a', ' a', 'b', ' a']] == ['a', 'a', 'b', 'a']
+    assert calls == [' a', 'b']
+    assert clean.stats() == {'hits': 2, 'misses': 2, 'evictions': 0, 'size': 2}
+
+
+def test_keys_keep_the_value_type():
+    clean, calls = counting_cleaner(8)
+    # Equal as dict keys, but each prints differently
+    assert [clean(1), clean(1.0), clean(True)] == ['1', '1.0', 'True']
+    # NaN never equals itself; NaN-like values of one type share a key
+    clean(np.nan)
+    clean(float('nan'))
+    assert len(calls) == 4
+    assert clean.stats()['hits'] == 1
+
+
+def test_least_recently_used_values_are_evicted():
+    clean, calls = counting_cleaner(2)
+    for value in ['a', 'b', 'a', 'c', 'b']:
+        clean(value)
+    # 'b' was the least recently used when 'c' came in
+    assert calls == ['a', 'b', 'c', 'b']
+    assert clean.stats() == {'hits': 1, 'misses': 4, 'evictions': 2, 'size': 2}
+
+
+def test_uncached_calls():
+    clean, calls = counting_cleaner(0)
+    clean('a')
+    clean('a')
+    assert calls == ['a', 'a']
+    clean, calls = counting_cleaner(8)
+    # Unhashable values go straight to the cleaner
+    clean(['a'])
+    clean(['a'])
+    assert len(calls) == 2
+    assert clean.stats()['size'] == 0
+
+
+def test_stats_since_a_snapshot():
+    before = cleaner_stats()
+    for _ in range(3):
+        clean_phone_number('9876543210 ')
+    counts = cleaner_stats(since=before)['clean_phone_number']
+    assert counts['hits'] + counts['misses'] == 3
+    assert counts['hits'] >= 2
+    assert hit_rate({'a': {'hits': 3, 'misses': 1}}) == 0.75
+    assert hit_rate({}) is None
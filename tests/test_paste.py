@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+from pipeline import run_pipeline, run_pasted
+
+COLUMNS = ['PNR', 'Leg Id', 'Guest Name', 'Whatsapp No', 'Service Date', 'Service Type', 'Service Name',
+           'Pickup Time', 'Vehical Name', 'Driver Name', 'Adult']
+
+ROWS = [
+    ['P1', '1', 'Guest One', '9876543210', '02-Jan-25', 'SHARING', 'Desert Safari', '14:00', 'Bus A', 'Ali', '2'],
+    # Merged vehicle and driver cells copy out as blanks
+    ['P2', '1', 'Guest Two', '', '02-Jan-25', 'SHARING', 'Desert Safari', '14:15', '', '', '1'],
+    ['P3', '1', 'Guest Three', '', '02-Jan-25', 'PRIVATE', 'City Tour', '09:00', 'Car', 'Omar', '3'],
+]
+
+
+def clipboard(rows):
+    """Cells as Excel copies them: tab-separated, header first, trailing line break."""
+    return '\r\n'.join('\t'.join(row) for row in [COLUMNS] + rows) + '\r\n'
+
+
+def test_pasted_rows_give_the_same_cards_as_the_file(tmp_path):
+    path = tmp_path / 'bookings.xlsx'
+    pd.DataFrame(ROWS, columns=COLUMNS).to_excel(path, index=False)
+    from_file = run_pipeline(str(path))
+    pasted = run_pasted(clipboard(ROWS))
+    assert pasted.formatted_cards == from_file.formatted_cards
+    assert len(pasted.formatted_cards) == 2
+
+
+def test_paste_without_tabs_is_rejected():
+    with pytest.raises(ValueError, match="Nothing was pasted"):
+        run_pasted('\r\n \r\n')
+    with pytest.raises(ValueError, match="no tab-separated columns"):
+        run_pasted('PNR Guest Name\nP1 Guest One')
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from data_processor import group_shared_services
+from utils import clean_phone_number, clean_phone_numbers
+
+PHONES = [
+    '9876543210', '+91 98765 43210', '919876543210', 'IND 98765-43210', 'India+971501234567',
+    '971501234567', '98765\t43210', '12345', '', '  ', np.nan, None, 9876543210, 98765.0,
+]
+
+
+def test_column_cleaner_matches_the_scalar():
+    series = pd.Series(PHONES, dtype=object)
+    assert clean_phone_numbers(series).tolist() == series.map(clean_phone_number).tolist()
+
+
+def test_grouping_cleans_phones_of_unprepared_frames():
+    # Rows straight from a reader, without the Clean<phone> columns prepare_bookings adds
+    df = pd.DataFrame({
+        'PNR': ['P1', 'P2'], 'LegId': ['1', '1'], 'GuestName': ['Guest One', 'Guest Two'],
+        'WhatsappNo': ['9876543210', 'IND 98765-43211'], 'AlternateNumber': ['', ''],
+        'ServiceDate': ['2025-01-02', '2025-01-02'], 'ServiceType': ['SHARING', 'SHARING'],
+        'ServiceName': ['Desert Safari', 'Desert Safari'], 'PickupTime': ['14:00', '14:15'],
+        'VehicalName': ['Bus A', 'Bus A'], 'Driver Name': ['Ali', 'Ali'],
+        'Driver Number': ['', ''], 'Vehicle Number': ['', ''], 'Adult': [2, 1],
+    })
+    records = group_shared_services(df)
+    assert len(records) == 1
+    phones = [p['whatsapp_no'] for p in records[0]['passengers']]
+    assert phones == ['+91 98765 43210', '+91 98765 43211']
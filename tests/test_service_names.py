@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processor import normalize_service_name, normalize_service_names
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('Desert Safari with BBQ Dinner XRQT', 'Desert Safari with BBQ Dinner'),
+    ('  NO KIDDING Dhow Cruise TOUR extra', 'Dhow Cruise'),
+    ('TOUR of the city', ''),
+    ('Burj Khalifa XRQT with', 'Burj Khalifa'),
+    ('Burj Khalifa XRQT  with!', 'Burj Khalifa with'),
+    ('Abu Dhabi\txrqt\n(124/125) with Lunch', 'Abu Dhabi 124125'),
+    ('Kelvin K and long ſ', 'Kelvin  and long'),
+])
+def test_normalize_service_name(value, expected):
+    assert normalize_service_name(value) == expected
+
+
+def test_column_normalizer_matches_the_scalar():
+    names = ['Desert Safari XRQT', 'Desert Safari XRQT', 'City Tour', 'NO KIDDING Dhow Cruise', '', None, np.nan]
+    for series in [pd.Series(names, dtype=object), pd.Series(names).astype('category'),
+                   pd.Series(names + [1, 1.0, True], dtype=object), pd.Series([], dtype=object)]:
+        assert normalize_service_names(series).tolist() == [normalize_service_name(v) for v in series]
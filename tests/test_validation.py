@@ -0,0 +1,61 @@
+import pandas as pd
+
+from validation import validate_bookings
+
+# One clean sharing booking; each case below breaks one field of a copy
+VALID = {
+    'PNR': 'P1', 'LegId': '1', 'ServiceDate': '2025-01-02', 'PickupTime': '08:45',
+    'WhatsappNo': '9876543210', 'AlternateNumber': '', 'Adult': 2, 'Child': 0, 'Infant': 0,
+    'ServiceType': 'SHARING', 'VehicalName': 'Bus',
+}
+
+
+def issues_for(**changes):
+    df = pd.DataFrame([VALID, dict(VALID, **changes)])
+    issues = validate_bookings(df)
+    # The untouched first row never has issues
+    assert (issues['Row'] == 2).all()
+    return list(zip(issues['Column'], issues['Issue'], issues['Severity']))
+
+
+def test_valid_booking_has_no_issues():
+    assert validate_bookings(pd.DataFrame([VALID])).empty
+
+
+def test_missing_keys():
+    assert issues_for(PNR='') == [('PNR', "Missing PNR", 'error')]
+    assert issues_for(LegId=' ') == [('LegId', "Missing LegId", 'error')]
+
+
+def test_service_dates():
+    assert issues_for(ServiceDate='') == [('ServiceDate', "Missing service date", 'error')]
+    assert issues_for(ServiceDate='TBA') == [('ServiceDate', "Unparseable service date", 'error')]
+
+
+def test_pickup_times_read_like_the_cards():
+    # HHMM and Excel day fractions are times, as time_to_sortable reads them
+    for value in ['0845', '8:05', '14:15:00', '0.354166']:
+        assert issues_for(PickupTime=value) == []
+    assert issues_for(PickupTime='') == [('PickupTime', "Missing pickup time", 'warning')]
+    assert issues_for(PickupTime='ab:cd') == [('PickupTime', "Unparseable pickup time", 'error')]
+    assert issues_for(PickupTime='soon') == [('PickupTime', "Unparseable pickup time", 'error')]
+    for value in ['25:00', '2460', '1.5']:
+        assert issues_for(PickupTime=value) == [('PickupTime', "Pickup time out of range", 'error')]
+
+
+def test_phone_numbers_checked_with_the_card_cleaner():
+    for value in ['+91 98765 43210', 'IND 98765-43210', '971501234567']:
+        assert issues_for(WhatsappNo=value) == []
+    assert issues_for(WhatsappNo='12345') == [('WhatsappNo', "Invalid phone number", 'warning')]
+    # clean_phone_number leaves a tab inside the number unformatted
+    assert issues_for(AlternateNumber='98765\t43210') == [
+        ('AlternateNumber', "Invalid phone number", 'warning')
+    ]
+
+
+def test_negative_pax_and_sharing_without_vehicle():
+    assert issues_for(Child=-1) == [('Child', "Negative pax count", 'error')]
+    assert issues_for(VehicalName='N/A') == [
+        ('VehicalName', "Sharing booking without a vehicle", 'warning')
+    ]
+    assert issues_for(ServiceType='PRIVATE', VehicalName='') == []
@@ -0,0 +1,108 @@
+"""
+Upload staging: spool large uploads to disk and bound concurrent ingests
+"""
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+from config import UPLOAD_SPOOL_BYTES, UPLOAD_MEMORY_BUDGET, MAX_CONCURRENT_INGESTS, UPLOAD_SPOOL_DIR
+from data_processor import get_source_name, get_source_size
+
+# Bytes copied per read while spooling
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadStager:
+    """
+    Decides where each upload lives while it is processed and how many
+    ingests run at once. Shared by all sessions of the server process.
+
+    An upload stays in memory when it is smaller than `spool_threshold` and
+    fits in what is left of `memory_budget` (bytes of in-memory uploads being
+    processed right now, across sessions). Anything else is copied to a temp
+    file in chunks and handed to the pipeline as a path: readers open it from
+    disk and the cache key is hashed from a memory map, so no further
+    in-memory copies are made.
+    """
+
+    def __init__(self, max_concurrent: int = 2, memory_budget: int = 64 * 1024 * 1024,
+                 spool_threshold: int = 8 * 1024 * 1024, spool_dir: Optional[str] = None):
+        self.max_concurrent = max_concurrent
+        self.memory_budget = memory_budget
+        self.spool_threshold = spool_threshold
+        self.spool_dir = spool_dir
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.in_memory_bytes = 0
+        self.spooled = 0
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+
+    @contextmanager
+    def slot(self, on_wait: Optional[Callable[[], None]] = None):
+        """Hold one of the ingest slots; calls `on_wait` first if none is free."""
+        if not self._slots.acquire(blocking=False):
+            if on_wait is not None:
+                on_wait()
+            self._slots.acquire()
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def _reserve_memory(self, size: int) -> bool:
+        """Count `size` against the memory budget if it fits."""
+        if size >= self.spool_threshold:
+            return False
+        with self._lock:
+            if self.in_memory_bytes + size > self.memory_budget:
+                return False
+            self.in_memory_bytes += size
+            return True
+
+    def _release_memory(self, size: int):
+        with self._lock:
+            self.in_memory_bytes -= size
+
+    @contextmanager
+    def stage(self, uploaded_file):
+        """
+        Yield a source for the pipeline: the upload itself when it is kept in
+        memory, else the path of a spooled copy (removed on exit). The spooled
+        file keeps the upload's base name so the extension still picks the reader.
+        """
+        size = get_source_size(uploaded_file)
+        if self._reserve_memory(size):
+            try:
+                yield uploaded_file
+            finally:
+                self._release_memory(size)
+            return
+
+        spool_dir = tempfile.mkdtemp(prefix='vtrack-upload-', dir=self.spool_dir)
+        try:
+            name = os.path.basename(get_source_name(uploaded_file)) or 'upload'
+            path = os.path.join(spool_dir, name)
+            if hasattr(uploaded_file, 'seek'):
+                uploaded_file.seek(0)
+            with open(path, 'wb') as f:
+                shutil.copyfileobj(uploaded_file, f, SPOOL_CHUNK_SIZE)
+            if hasattr(uploaded_file, 'seek'):
+                uploaded_file.seek(0)
+            with self._lock:
+                self.spooled += 1
+            yield path
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+def create_upload_stager() -> UploadStager:
+    """Stager configured from config.py / VTRACK_* environment variables."""
+    return UploadStager(
+        max_concurrent=MAX_CONCURRENT_INGESTS,
+        memory_budget=UPLOAD_MEMORY_BUDGET,
+        spool_threshold=UPLOAD_SPOOL_BYTES,
+        spool_dir=UPLOAD_SPOOL_DIR
+    )
@@ -1,12 +1,25 @@
 """
 Utility functions for data cleaning and formatting
 """
-import re
+import warnings
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+from pandas.tseries.api import guess_datetime_format
+from memo import memoize_cleaner
+from patterns import (
+    PHONE_COUNTRY_TEXT, PHONE_NON_DIAL_CHARS, NON_DIGITS, NON_DATE_CHARS, WHITESPACE_RUN, NON_FLIGHT_CHARS
+)
 
+# Date text on the cards, e.g. 05-JAN-25 (upper-cased)
+CARD_DATE_FORMAT = "%d-%b-%y"
 
+# Distinct values tried when inferring a date column's format
+DATE_SAMPLE_SIZE = 5
+
+
+@memoize_cleaner
 def clean_phone_number(phone: str) -> str:
     """Clean and format phone numbers with EXACT spacing as in example."""
     if pd.isna(phone) or phone is None:
@@ -15,13 +28,13 @@ def clean_phone_number(phone: str) -> str:
     phone_str = str(phone).strip()
     
     # Remove country code text
-    phone_str = re.sub(r'(?i)(india|ind)\s*', '', phone_str)
-    phone_str = re.sub(r'[^\d\s\+]', '', phone_str)
+    phone_str = PHONE_COUNTRY_TEXT.sub('', phone_str)
+    phone_str = PHONE_NON_DIAL_CHARS.sub('', phone_str)
     phone_str = phone_str.strip()
     
     # Format as +91 XXXXX XXXXX (EXACT format from example)
     if phone_str and phone_str.replace('+', '').replace(' ', '').isdigit():
-        digits = re.sub(r'[^\d]', '', phone_str)
+        digits = NON_DIGITS.sub('', phone_str)
         if digits.startswith('91') and len(digits) >= 12:
             # Format: +91 XXXXX XXXXX
             phone_str = f"+91 {digits[2:7]} {digits[7:]}"
@@ -34,43 +47,179 @@ def clean_phone_number(phone: str) -> str:
     return phone_str
 
 
-def format_date(date_val: Any) -> str:
-    """Format date in DD-MMM-YY format with EXACT spacing."""
+def clean_phone_numbers(series: pd.Series) -> pd.Series:
+    """
+    clean_phone_number over a whole column, with identical output.
+    Each distinct value is cleaned once, with pandas string operations
+    (object dtype, so they run the same Python str / re code as the scalar).
+    """
+    raw = series.to_numpy(dtype=object)
+    # str() like the scalar; missing values clean to "" just as an empty cell does
+    text = ['' if missing else value if type(value) is str else str(value)
+            for value, missing in zip(raw, pd.isna(raw))]
+    codes, uniques = pd.factorize(np.array(text, dtype=object))
+    phone = pd.Series(uniques, dtype=object).str.strip()
+
+    # Remove country code text
+    phone = phone.str.replace(PHONE_COUNTRY_TEXT, '', regex=True)
+    phone = phone.str.replace(PHONE_NON_DIAL_CHARS, '', regex=True).str.strip()
+
+    # Only '+', spaces and digits are left, so the digits are the text without '+' and spaces
+    digits = phone.str.replace('+', '', regex=False).str.replace(' ', '', regex=False)
+    length = digits.str.len()
+    is_number = digits.str.isdigit()
+    with_91 = is_number & digits.str.startswith('91') & (length >= 12)
+    local = is_number & ~with_91 & (length == 10)
+    with_code = is_number & ~with_91 & ~local & (length == 12)
+
+    phone[with_91] = '+91 ' + digits[with_91].str[2:7] + ' ' + digits[with_91].str[7:]
+    phone[local] = '+91 ' + digits[local].str[:5] + ' ' + digits[local].str[5:]
+    phone[with_code] = ('+' + digits[with_code].str[:2] + ' ' + digits[with_code].str[2:7]
+                        + ' ' + digits[with_code].str[7:])
+
+    return pd.Series(phone.to_numpy(dtype=object)[codes], index=series.index, dtype=object)
+
+
+def parse_date(date_val: Any) -> Optional[datetime]:
+    """Date format_date reads from a value (None when it reads none)."""
     if pd.isna(date_val):
-        return ""
+        return None
     
     try:
         # Try pandas parser first
         dt = pd.to_datetime(date_val, errors='coerce')
         if pd.notna(dt):
-            return dt.strftime("%d-%b-%y").upper()
+            return dt
         
         # Try string parsing
         date_str = str(date_val).strip()
         # Remove any non-date characters
-        date_str = re.sub(r'[^\d/\-\.]', '', date_str)
+        date_str = NON_DATE_CHARS.sub('', date_str)
         
         for fmt in ['%d-%b-%y', '%d/%b/%y', '%d-%b-%Y', '%d/%b/%Y', 
                    '%d-%m-%y', '%d/%m/%y', '%d-%m-%Y', '%d/%m/%Y',
                    '%Y-%m-%d', '%Y/%m/%d']:
             try:
-                dt = datetime.strptime(date_str, fmt)
-                return dt.strftime("%d-%b-%y").upper()
+                return datetime.strptime(date_str, fmt)
             except:
                 continue
     except:
         pass
     
+    return None
+
+
+@memoize_cleaner
+def format_date(date_val: Any) -> str:
+    """Format date in DD-MMM-YY format with EXACT spacing."""
+    if pd.isna(date_val):
+        return ""
+    
+    dt = parse_date(date_val)
+    if dt is not None:
+        try:
+            return dt.strftime("%d-%b-%y").upper()
+        except:
+            pass
+    
     return str(date_val)
 
 
+def _infer_date_format(values: pd.Series) -> Optional[str]:
+    """strftime format of the first sample value pandas can guess one for (None if none)."""
+    with warnings.catch_warnings():
+        # Day-first guesses warn; _day_first_ambiguous deals with them
+        warnings.simplefilter('ignore')
+        for value in values.head(DATE_SAMPLE_SIZE):
+            fmt = guess_datetime_format(value.strip())
+            if fmt is not None:
+                return fmt
+    return None
+
+
+def _day_first_ambiguous(parsed: pd.Series, fmt: str) -> pd.Series:
+    """
+    Dates a day-first numeric format read differently from format_date,
+    which parses month first whenever the day could be a month.
+    """
+    day, month = fmt.find('%d'), fmt.find('%m')
+    if day == -1 or month == -1 or day > month:
+        return pd.Series(False, index=parsed.index)
+    return parsed.dt.day <= 12
+
+
+def _parse_by_column_format(uniques: pd.Series) -> pd.Series:
+    """
+    Dates of the distinct values that fit the column's format, inferred once
+    from a sample and applied in one to_datetime call. Values it does not
+    fit, or reads differently from parse_date, are left out.
+    """
+    text = uniques[uniques.map(lambda value: isinstance(value, str))]
+    fmt = _infer_date_format(text)
+    if fmt is None:
+        return pd.Series(dtype='datetime64[ns]')
+    parsed = pd.to_datetime(text, format=fmt, errors='coerce')
+    return parsed[parsed.notna() & ~_day_first_ambiguous(parsed, fmt)]
+
+
+def format_dates(series: pd.Series) -> pd.Series:
+    """
+    format_date over a whole column, with identical output.
+    Datetime columns are formatted in one strftime call. For text, every
+    distinct value is parsed at once with the column's format (see
+    _parse_by_column_format); only the values it does not fit go through
+    format_date one by one.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        formatted = series.dt.strftime(CARD_DATE_FORMAT).str.upper()
+        return formatted.astype(object).where(series.notna(), "")
+
+    codes, uniques = pd.factorize(series.to_numpy(dtype=object))
+    uniques = pd.Series(uniques, dtype=object)
+    formatted = pd.Series(None, index=uniques.index, dtype=object)
+
+    parsed = _parse_by_column_format(uniques)
+    formatted[parsed.index] = parsed.dt.strftime(CARD_DATE_FORMAT).str.upper().astype(object)
+
+    residue = formatted.isna()
+    formatted[residue] = uniques[residue].map(format_date).astype(object)
+    # Missing values (code -1) become ""
+    return pd.Series(np.append(formatted.to_numpy(dtype=object), "")[codes], index=series.index, dtype=object)
+
+
+def parse_dates(series: pd.Series) -> pd.Series:
+    """
+    parse_date over a whole column, as naive datetimes (NaT where no date
+    is read; time zones are dropped, keeping the wall-clock time the cards
+    show). Distinct values are parsed like format_dates parses them, so a
+    row's datetime always matches its formatted date.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.tz_localize(None) if series.dt.tz is not None else series
+
+    codes, uniques = pd.factorize(series.to_numpy(dtype=object))
+    uniques = pd.Series(uniques, dtype=object)
+    dates = pd.Series(None, index=uniques.index, dtype=object)
+
+    parsed = _parse_by_column_format(uniques)
+    dates[parsed.index] = parsed.astype(object)
+
+    residue = dates.isna()
+    dates[residue] = uniques[residue].map(parse_date).astype(object)
+    naive = [pd.NaT if dt is None else pd.Timestamp(dt).tz_localize(None) for dt in dates]
+    # Missing values (code -1) become NaT
+    parsed = pd.to_datetime(pd.Series(naive + [pd.NaT], dtype=object), errors='coerce')
+    return pd.Series(parsed.to_numpy()[codes], index=series.index)
+
+
+@memoize_cleaner
 def clean_name(name: str) -> str:
     """Clean guest names with proper spacing."""
     if pd.isna(name) or name is None:
         return ""
     
     name_str = str(name).strip()
-    name_str = re.sub(r'\s+', ' ', name_str)
+    name_str = WHITESPACE_RUN.sub(' ', name_str)
     
     # Fix common title issues
     if name_str.upper().startswith('MR.'):
@@ -91,7 +240,7 @@ def clean_flight_number(flight_no: str) -> str:
     flight_str = str(flight_no).strip()
 
     # Remove unwanted characters but KEEP spacing and newlines
-    flight_str = re.sub(r'[^\w\s\-]', '', flight_str)
+    flight_str = NON_FLIGHT_CHARS.sub('', flight_str)
 
     # Remove known invalid placeholders
     if flight_str.strip() in ['', '-', 'N/A', 'NA']:
@@ -117,6 +266,7 @@ def format_pax_count(adult: int, child: int, infant: int) -> str:
     return f"{adult} PAX"
 
 
+@memoize_cleaner
 def clean_time(time_val):
     """Clean and format time."""
     if pd.isna(time_val):
@@ -165,6 +315,29 @@ def time_to_minutes(time_str: str) -> int:
         return 0
 
 
+def time_to_sortable(t) -> str:
+    """Convert a pickup time to a sortable HH:MM string ("99:99" sorts last)."""
+    if pd.isna(t) or not t or str(t).strip() == '':
+        return "99:99"
+    time_str = str(t).strip()
+    if ':' in time_str:
+        parts = time_str.split(':')
+        hours = parts[0].zfill(2)
+        minutes = parts[1][:2].zfill(2) if len(parts) > 1 else "00"
+        return f"{hours}:{minutes}"
+    elif len(time_str) == 4 and time_str.replace(':', '').isdigit():
+        return f"{time_str[:2]}:{time_str[2:]}"
+    else:
+        try:
+            # Try to parse as float (Excel time)
+            time_val = float(time_str)
+            hours = int(time_val * 24)
+            minutes = int((time_val * 24 * 60) % 60)
+            return f"{hours:02d}:{minutes:02d}"
+        except:
+            return "99:99"
+
+
 def are_times_similar(time1, time2, max_diff_minutes=30):
     """Check if two times are within specified minutes."""
     if not time1 or not time2:
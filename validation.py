@@ -0,0 +1,146 @@
+"""
+Column-wise data-quality checks over a normalized booking frame
+"""
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+from utils import format_dates, clean_phone_numbers
+
+ISSUE_COLUMNS = ['Row', 'PNR', 'Column', 'Issue', 'Severity', 'Value']
+
+# Vehicle values group_shared_services treats as "no vehicle"
+NO_VEHICLE_VALUES = ['', '-', 'N/A', 'NA', 'n/a', 'na']
+
+# Card dates look like 05-JAN-25; anything else is format_dates giving up
+CARD_DATE = r'^\d{2}-[A-Z]{3}-\d{2}$'
+
+# Card numbers look like +91 98765 43210; clean_phone_number leaves anything else as it was
+CARD_PHONE = r'^\+\d{2} \d{5} \d{5,}$'
+
+
+def _text(df: pd.DataFrame, column: str) -> pd.Series:
+    """Stripped text of a column ('' when the column is absent)."""
+    if column not in df.columns:
+        return pd.Series('', index=df.index)
+    return df[column].astype(str).str.strip()
+
+
+def _date_checks(df: pd.DataFrame) -> List[Tuple[str, str, str, pd.Series]]:
+    if 'ServiceDate' not in df.columns:
+        return []
+    dates = df['ServiceDate']
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return [('ServiceDate', "Missing service date", 'error', dates.isna())]
+
+    text = dates.astype(str).str.strip()
+    # Parse exactly as the cards do
+    formatted = format_dates(text)
+    missing = text == ''
+    return [
+        ('ServiceDate', "Missing service date", 'error', missing),
+        ('ServiceDate', "Unparseable service date", 'error',
+         ~missing & ~formatted.str.match(CARD_DATE)),
+    ]
+
+
+def _pickup_checks(df: pd.DataFrame) -> List[Tuple[str, str, str, pd.Series]]:
+    text = _text(df, 'PickupTime')
+    missing = text == ''
+    has_colon = text.str.contains(':', regex=False)
+    # Read times the way time_to_sortable does for the cards: H:MM[:SS],
+    # then HHMM, then an Excel day fraction
+    colon = text.str.extract(r'^(\d{1,2}):(\d{1,2})')
+    hhmm = text.str.extract(r'^(\d{2})(\d{2})$')
+    fraction = pd.to_numeric(text.where(~has_colon), errors='coerce')
+    hours = (
+        pd.to_numeric(colon[0], errors='coerce')
+        .fillna(pd.to_numeric(hhmm[0], errors='coerce'))
+        .fillna(np.floor(fraction * 24))
+    )
+    minutes = (
+        pd.to_numeric(colon[1], errors='coerce')
+        .fillna(pd.to_numeric(hhmm[1], errors='coerce'))
+        .fillna(np.floor(fraction * 24 * 60 % 60))
+    )
+    parsed = hours.notna()
+    return [
+        ('PickupTime', "Missing pickup time", 'warning', missing),
+        ('PickupTime', "Unparseable pickup time", 'error', ~missing & ~parsed),
+        ('PickupTime', "Pickup time out of range", 'error',
+         parsed & ((hours < 0) | (hours > 23) | (minutes < 0) | (minutes > 59))),
+    ]
+
+
+def _phone_checks(df: pd.DataFrame, column: str) -> List[Tuple[str, str, str, pd.Series]]:
+    """Numbers clean_phone_number cannot bring into +CC XXXXX XXXXX form."""
+    if column not in df.columns:
+        return []
+    # Clean exactly as the cards do (prepared frames carry the cleaned numbers)
+    cleaned = f'Clean{column}'
+    formatted = df[cleaned] if cleaned in df.columns else clean_phone_numbers(df[column])
+    text = _text(df, column)
+    return [(column, "Invalid phone number", 'warning', (text != '') & ~formatted.str.match(CARD_PHONE))]
+
+
+def validate_bookings(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Run every check over the whole frame at once and return one row per
+    issue: Row (1-based data row below the header), PNR, Column, Issue,
+    Severity ('error' or 'warning') and the offending Value, plus SheetName
+    / SourceFile when the frame has them. Empty when nothing was found.
+    """
+    checks = [
+        ('PNR', "Missing PNR", 'error', _text(df, 'PNR') == ''),
+        ('LegId', "Missing LegId", 'error', _text(df, 'LegId') == ''),
+    ]
+    checks += _date_checks(df)
+    checks += _pickup_checks(df)
+    checks += _phone_checks(df, 'WhatsappNo')
+    checks += _phone_checks(df, 'AlternateNumber')
+    for column in ['Adult', 'Child', 'Infant']:
+        if column in df.columns:
+            checks.append((column, "Negative pax count", 'error', df[column] < 0))
+
+    is_sharing = _text(df, 'ServiceType').str.upper() == 'SHARING'
+    no_vehicle = _text(df, 'VehicalName').isin(NO_VEHICLE_VALUES)
+    checks.append(('VehicalName', "Sharing booking without a vehicle", 'warning', is_sharing & no_vehicle))
+
+    context = issue_context(df)
+    frames = []
+    for column, issue, severity, mask in checks:
+        mask = mask.to_numpy(dtype=bool)
+        if not mask.any():
+            continue
+        rows = df.loc[mask]
+        values = rows[column].astype(str).to_numpy() if column in rows.columns else ''
+        frames.append(issue_table(rows, column, issue, severity, values))
+    return sort_issues(frames, context)
+
+
+def issue_context(df: pd.DataFrame) -> List[str]:
+    """Columns naming where a row came from, carried into the issue table."""
+    return [col for col in ('SheetName', 'SourceFile') if col in df.columns]
+
+
+def issue_table(rows: pd.DataFrame, column: str, issue: str, severity: str, values) -> pd.DataFrame:
+    """Issue rows for the given booking rows (index labels are 0-based data rows)."""
+    frame = pd.DataFrame({
+        'Row': rows.index + 1,
+        'PNR': _text(rows, 'PNR').to_numpy(),
+        'Column': column,
+        'Issue': issue,
+        'Severity': severity,
+        'Value': values,
+    })
+    for col in issue_context(rows):
+        frame[col] = rows[col].astype(str).to_numpy()
+    return frame
+
+
+def sort_issues(frames: List[pd.DataFrame], context: List[str]) -> pd.DataFrame:
+    """Concatenate issue tables, ordered by sheet / file and row."""
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=ISSUE_COLUMNS + context)
+    issues = pd.concat(frames, ignore_index=True)
+    return issues.sort_values(context + ['Row'], kind='stable', ignore_index=True)